@@ -1,4 +1,4 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 from pydantic import BaseModel, Field
 import json
 
@@ -24,7 +24,54 @@ class ThoughtStep(BaseModel):
     observation: Optional[Observation] = None  # Result observed after action
     pause_reflection: Optional[str] = None  # Optional reflection if agent paused
 
+# Define the saved state of a run suspended while waiting for user input
+class RunContinuation(BaseModel):
+    run_id: str  # Identifies the suspended run
+    query: str  # Original question
+    steps: List[list]  # Compact trace records (see CompactTrace.to_state)
+    pending_input: Any = None  # Question the agent asked the user
+    iterations_count: int = 0  # Iterations used before suspending
+    elapsed_seconds: float = 0.0  # Wall-clock time used before suspending
+    tokens_used: int = 0  # Tokens used before suspending
+    memory_context: str = ""  # Long-term memories recalled at run start
+
 # Define the full agent response
 class AgentResponse(BaseModel):
     thought_process: List[ThoughtStep]  # Steps including thoughts, actions, and observations
     final_answer: Optional[str] = None  # Final answer after reasoning
+    status: str = "completed"  # "completed", or "suspended" while waiting for user input
+    continuation: Optional[RunContinuation] = None  # Pass to ReactAgent.resume() with the user's answer
+
+# Define the events yielded by ReactAgent.stream() as a run progresses
+class AgentEvent(BaseModel):
+    type: str
+    iteration: int = 0  # Iteration the event belongs to
+
+class StepStarted(AgentEvent):
+    type: Literal["step_started"] = "step_started"
+
+class ThoughtEvent(AgentEvent):
+    type: Literal["thought"] = "thought"
+    thought: str  # Parsed reasoning of this step
+
+class ActionDispatched(AgentEvent):
+    type: Literal["action"] = "action"
+    action: Action  # Action about to be executed
+
+class ObservationReceived(AgentEvent):
+    type: Literal["observation"] = "observation"
+    action: Action  # Action that produced the observation
+    result: Any  # Tool result
+
+class AnswerDelta(AgentEvent):
+    type: Literal["answer_delta"] = "answer_delta"
+    delta: str  # Next piece of the final answer as the model streams it
+
+class AnswerRetracted(AgentEvent):
+    type: Literal["answer_retracted"] = "answer_retracted"
+    # The deltas streamed in this iteration were not the final answer (e.g. the step went on
+    # to an Action); discard them. RunFinished always carries the answer run() returns
+
+class RunFinished(AgentEvent):
+    type: Literal["finished"] = "finished"
+    response: AgentResponse  # Same response run() would return
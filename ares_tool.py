@@ -1,4 +1,4 @@
-from .base_tool import Tool
+from .base_tool import InputError, Tool
 from typing import Any, Optional, Dict
 from abc import ABC, abstractmethod
 from pydantic import BaseModel, PrivateAttr
@@ -23,7 +23,7 @@ class AresInternetTool(Tool):
 
     def run(self, input_text: Any) -> str:
         if not isinstance(input_text, str):
-            return "❌ Error: Expected a search query string."
+            return InputError("❌ Error: Expected a search query string.")
 
         api_key = self._config.get("api_key")
 
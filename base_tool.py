@@ -1,27 +1,32 @@
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, List
 from abc import ABC, abstractmethod
-from pydantic import BaseModel, PrivateAttr
+from pydantic import BaseModel, Field, PrivateAttr
 import math
 import requests
 import json
 import os
 
 
-class ToolOutput:
+class ToolOutput(BaseModel):
+    """
+    Wraps the result returned from a tool, plus any generated images. A pydantic
+    model, so observations holding one still serialise with the AgentResponse.
+    """
+    result: str
+    image_url: Optional[str] = None
+    image_paths: List[str] = Field(default_factory=list)
 
-    def __init__(self, result: str):
-        """
-        Wraps the result returned from a tool.
-        """
-        self.result = result
-
-        from pydantic import BaseModel
+    def __str__(self):
+        # The agent formats observations with str(), so the model sees the result text
+        return self.result
 
-        class ToolOutput(BaseModel):
-            result: str
 
-    def __repr__(self):
-        return f"ToolOutput(result={self.result})"
+class InputError(str):
+    """
+    Error message for input the tool cannot use. Returned like any other error string,
+    but the tool executor doesn't count it against the tool's circuit breaker: the
+    call was wrong, not the tool or its upstream service.
+    """
 
 
 # Base Tool class
@@ -35,6 +40,13 @@ class Tool(ABC, BaseModel):
     def run(self, input_text: Any) -> str:
         pass
 
+    def execution_timeout(self, input_text: Any) -> Optional[float]:
+        """
+        Deadline in seconds for one call when run by a ToolExecutor. None uses the
+        executor's default; tools whose calls legitimately run longer override this.
+        """
+        return None
+
     def get_tool_description(self) -> str:
         return (
             f"Tool: {self.name}\n"
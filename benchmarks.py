@@ -0,0 +1,270 @@
+# benchmarks.py
+"""
+Micro-benchmarks for the agent. Run all of them with `python -m <package>.benchmarks`.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from .base_tool import Tool
+from .model import ModelClient, estimate_tokens
+from .trace import CompactTrace
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_TOPICS = [
+    ("weather", "Looks up the current weather forecast for a city."),
+    ("stock", "Fetches stock prices and company financials for a ticker."),
+    ("translate", "Translates text between natural languages."),
+    ("calendar", "Creates and lists calendar events and meetings."),
+    ("email", "Drafts and sends email messages to contacts."),
+    ("search", "Searches the web for recent news articles."),
+    ("math", "Evaluates arithmetic and algebraic expressions."),
+    ("image", "Generates an image from a text prompt."),
+    ("pdf", "Reads and searches text inside PDF documents."),
+    ("maps", "Finds directions and travel time between two places."),
+]
+
+
+class _SyntheticTool(Tool):
+    def run(self, input_text: Any) -> str:
+        return f"ok: {input_text}"
+
+
+class _EchoModel(ModelClient):
+    def chat_completion(self, system_prompt: str, user_prompt: str,
+                        temperature: Optional[float] = None,
+                        max_tokens: Optional[int] = None) -> str:
+        return "Thought: done.\nFinal Answer: done."
+
+
+def make_synthetic_tools(count: int) -> List[Tool]:
+    """
+    Builds `count` distinct tools cycling through a handful of topics.
+    """
+    tools = []
+    for i in range(count):
+        topic, description = _TOPICS[i % len(_TOPICS)]
+        tools.append(_SyntheticTool(
+            name=f"{topic.title()} Tool {i}",
+            description=f"{description} Variant {i}.",
+            action_type=f"{topic}_{i}",
+            input_format="A query as a string. Example: 'example query'",
+        ))
+    return tools
+
+
+def benchmark_tool_prompt_tokens(registry_sizes: Sequence[int] = (10, 50, 100, 250, 500),
+                                 top_k: int = 5,
+                                 query: str = "What is the stock price of AAPL and the weather in Paris?") -> List[Dict[str, Any]]:
+    """
+    Compares system prompt tokens with every tool described vs. only the top-k retrieved tools.
+    """
+    from .react_agent import ReactAgent
+
+    rows = []
+    for size in registry_sizes:
+        tools = make_synthetic_tools(size)
+        agent = ReactAgent(model=_EchoModel(), tools=tools, tool_top_k=top_k)
+        full_tokens = estimate_tokens(agent.system_prompt)
+        retrieved_tokens = estimate_tokens(agent._get_system_prompt(query, CompactTrace()))
+        rows.append({"tools": size, "full_prompt_tokens": full_tokens, "top_k_prompt_tokens": retrieved_tokens})
+
+    print(f"{'tools':>8} {'full':>10} {'top-' + str(top_k):>10}")
+    for row in rows:
+        print(f"{row['tools']:>8} {row['full_prompt_tokens']:>10} {row['top_k_prompt_tokens']:>10}")
+    return rows
+
+
+def benchmark_trace_memory(sessions: int = 200, steps: int = 10, observation_chars: int = 8000,
+                           spill_threshold: int = 2048) -> Dict[str, float]:
+    """
+    Measures per-session trace memory: pydantic ThoughtSteps vs. CompactTrace with blob spilling.
+    """
+    from .agent import Action, Observation, ThoughtStep
+
+    def observation(session: int, step: int) -> str:
+        # Unique per session and step, so content addressing cannot deduplicate them
+        return f"session {session} step {step} " + "x" * observation_chars
+
+    def measure(build) -> float:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [build(session) for session in range(sessions)]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        return (after - before) / sessions
+
+    def build_pydantic(session: int):
+        return [
+            ThoughtStep(thought=f"Step {step} reasoning.",
+                        action=Action(action_type="search", input=f"query {step}"),
+                        observation=Observation(result=observation(session, step)))
+            for step in range(steps)
+        ]
+
+    traces = []
+
+    def build_compact(session: int):
+        trace = CompactTrace(spill_threshold=spill_threshold)
+        for step in range(steps):
+            trace.append(thought=f"Step {step} reasoning.",
+                         action=Action(action_type="search", input=f"query {step}"),
+                         observation=observation(session, step))
+        traces.append(trace)
+        return trace
+
+    result = {"pydantic_bytes_per_session": measure(build_pydantic),
+              "compact_bytes_per_session": measure(build_compact)}
+    for trace in traces:
+        trace.close()
+
+    print(f"{sessions} sessions x {steps} steps, {observation_chars}-char observations")
+    print(f"  pydantic trace: {result['pydantic_bytes_per_session'] / 1024:10.1f} KiB/session")
+    print(f"  compact trace:  {result['compact_bytes_per_session'] / 1024:10.1f} KiB/session")
+    return result
+
+
+def start_stub_completions_server(base_latency: float = 0.05, per_prompt_latency: float = 0.005):
+    """
+    Starts a local OpenAI-compatible /v1/completions stub simulating a single-worker
+    CPU inference server: requests are served one at a time, and a request with n
+    prompts takes base_latency + n * per_prompt_latency seconds.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    worker_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompts = body["prompt"] if isinstance(body["prompt"], list) else [body["prompt"]]
+            with worker_lock:
+                time.sleep(base_latency + per_prompt_latency * len(prompts))
+            payload = json.dumps({
+                "id": "cmpl-stub", "object": "text_completion", "created": int(time.time()), "model": body["model"],
+                "choices": [{"index": i, "text": "Thought: done.\nFinal Answer: ok", "finish_reason": "stop", "logprobs": None}
+                            for i in range(len(prompts))],
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def benchmark_batching_throughput(concurrency: int = 32, calls_per_session: int = 4,
+                                  batch_window_ms: float = 10.0, max_batch_size: int = 16) -> Dict[str, float]:
+    """
+    Compares requests/second from concurrent sessions with and without micro-batching.
+    """
+    from .model import BatchingClient
+
+    server, base_url = start_stub_completions_server()
+    results = {}
+    try:
+        for label, batch_size in (("unbatched", 1), ("batched", max_batch_size)):
+            client = BatchingClient(base_url=base_url, api_key="stub", batch_window_ms=batch_window_ms,
+                                    max_batch_size=batch_size)
+
+            def session(_):
+                for _ in range(calls_per_session):
+                    client.chat_completion("You are a test.", "Question: ping")
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(session, range(concurrency)))
+            elapsed = time.perf_counter() - started
+            client.close()
+            results[f"{label}_requests_per_second"] = concurrency * calls_per_session / elapsed
+    finally:
+        server.shutdown()
+
+    print(f"{concurrency} sessions x {calls_per_session} calls, window {batch_window_ms}ms")
+    print(f"  unbatched: {results['unbatched_requests_per_second']:8.1f} req/s")
+    print(f"  batched:   {results['batched_requests_per_second']:8.1f} req/s (max batch {max_batch_size})")
+    return results
+
+
+def make_synthetic_pdf(path: str, pages: int = 200, lines_per_page: int = 40) -> str:
+    """
+    Writes a plain-text PDF (Helvetica, one content stream per page) without any PDF library.
+    """
+    words = ["agent", "tool", "query", "revenue", "latency", "memory", "trace", "model", "stock", "weather"]
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page in range(pages):
+        lines = [f"Page {page + 1} line {line}: " + " ".join(words[(page + line + i) % len(words)] for i in range(12))
+                 for line in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({text}) '" for text in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {len(objects)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>".encode("latin-1"))
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {pages} >>".encode("latin-1")
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += b"".join(f"{offset:010d} 00000 n \n".encode("latin-1") for offset in offsets)
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def benchmark_pdf_ingestion(pages: int = 400, worker_counts: Sequence[int] = (1, 2, 4)) -> List[Dict[str, float]]:
+    """
+    Measures pages/second of the PDF pipeline per worker count, the time until the
+    first chunk is available, and the cost of re-ingesting an unchanged file.
+    """
+    from .readpdf import PDFIngestor, iter_chunks, iter_pdf_pages
+    import tempfile
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), pages=pages)
+        for workers in worker_counts:
+            started = time.perf_counter()
+            first_chunk = None
+            chunks = 0
+            for _ in iter_chunks(iter_pdf_pages(pdf_path, max_workers=workers)):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                chunks += 1
+            elapsed = time.perf_counter() - started
+            rows.append({"workers": workers, "pages_per_second": pages / elapsed,
+                         "first_chunk_seconds": first_chunk, "chunks": chunks})
+
+        ingestor = PDFIngestor(path=os.path.join(tmp, "index"), max_workers=max(worker_counts))
+        ingestor.ingest(pdf_path)
+        started = time.perf_counter()
+        ingestor.ingest(pdf_path)
+        reingest_seconds = time.perf_counter() - started
+
+    print(f"{pages}-page PDF")
+    print(f"{'workers':>8} {'pages/s':>10} {'1st chunk':>10} {'chunks':>8}")
+    for row in rows:
+        print(f"{row['workers']:>8} {row['pages_per_second']:>10.1f} {row['first_chunk_seconds']:>9.3f}s {row['chunks']:>8}")
+    print(f"  unchanged re-ingest: {reingest_seconds * 1000:.2f}ms")
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark_tool_prompt_tokens()
+    benchmark_trace_memory()
+    benchmark_batching_throughput()
+    benchmark_pdf_ingestion()
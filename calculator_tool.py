@@ -1,4 +1,4 @@
-from .base_tool import Tool
+from .base_tool import InputError, Tool
 from typing import Any, Optional, Dict
 from abc import ABC, abstractmethod
 from pydantic import BaseModel, PrivateAttr
@@ -22,4 +22,4 @@ class CalculateTool(Tool):
             result = eval(safe_expr)
             return str(result)
         except Exception:
-            return "Error: Invalid calculation."
\ No newline at end of file
+            return InputError("Error: Invalid calculation.")
\ No newline at end of file
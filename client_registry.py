@@ -0,0 +1,140 @@
+# client_registry.py
+from typing import Any, Callable, Dict, Optional
+import httpx
+import openai
+import os
+import sys
+import threading
+
+# HTTP/2 needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_pool_settings: Dict[str, Any] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "http2": None,  # None = use HTTP/2 when h2 is installed
+    "timeout": 600.0,
+}
+_http_client: Optional[httpx.Client] = None
+_clients: Dict[tuple, Any] = {}
+_shared: Dict[tuple, Any] = {}
+_lock = threading.Lock()
+
+
+def configure_http_pool(max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None,
+                        keepalive_expiry: Optional[float] = None, http2: Optional[bool] = None,
+                        timeout: Optional[float] = None):
+    """
+    Tunes the process-wide HTTP connection pool. Call once at startup; clients
+    created before the call keep using the previous pool.
+    """
+    global _http_client
+    with _lock:
+        for name, value in (("max_connections", max_connections),
+                            ("max_keepalive_connections", max_keepalive_connections),
+                            ("keepalive_expiry", keepalive_expiry),
+                            ("http2", http2),
+                            ("timeout", timeout)):
+            if value is not None:
+                _pool_settings[name] = value
+        _http_client = None
+        _clients.clear()
+
+
+def _get_http_client_locked() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        http2 = _pool_settings["http2"]
+        http2 = HTTP2_AVAILABLE if http2 is None else (http2 and HTTP2_AVAILABLE)
+        _http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=_pool_settings["max_connections"],
+                max_keepalive_connections=_pool_settings["max_keepalive_connections"],
+                keepalive_expiry=_pool_settings["keepalive_expiry"],
+            ),
+            http2=http2,
+            timeout=httpx.Timeout(_pool_settings["timeout"], connect=10.0),
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Returns the shared httpx client whose connection pool all model clients reuse.
+    """
+    with _lock:
+        return _get_http_client_locked()
+
+
+def get_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None, provider: str = "openai") -> Any:
+    """
+    Returns the shared openai.OpenAI client for (provider, api_key, base_url), creating
+    it on first use. All of them send requests through the same HTTP pool.
+    """
+    api_key = api_key or os.environ.get("OPENAI_API_KEY")
+    key = (provider, api_key, base_url)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=_get_http_client_locked())
+            _clients[key] = client
+        return client
+
+
+def get_shared_client(key: tuple, factory: Callable[[], Any]) -> Any:
+    """
+    Returns the process-wide object registered under `key`, creating it with `factory`
+    on first use, e.g. one request batcher for every model handle with the same
+    settings. Objects with a close() method are closed by close_http_pool().
+    """
+    with _lock:
+        shared = _shared.get(key)
+    if shared is not None:
+        return shared
+    # Created outside the lock: factories may call get_openai_client()
+    created = factory()
+    with _lock:
+        shared = _shared.setdefault(key, created)
+    if shared is not created and hasattr(created, "close"):
+        created.close()  # Lost a race with another thread
+    return shared
+
+
+def client_registry_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "clients": len(_clients),
+            "shared_clients": len(_shared),
+            "http2_available": HTTP2_AVAILABLE,
+            **_pool_settings,
+        }
+
+
+def close_http_pool():
+    """
+    Closes the shared pool and shared clients (e.g. at shutdown). Later calls create
+    fresh ones; model clients and tools look their client up per call, so existing
+    handles keep working. Code holding on to a client returned by get_openai_client()
+    must fetch it again.
+    """
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+            # LiteLLM would keep sending through the closed client; it is set again on next use
+            litellm = sys.modules.get("litellm")
+            if litellm is not None and getattr(litellm, "client_session", None) is _http_client:
+                litellm.client_session = None
+        _http_client = None
+        _clients.clear()
+        shared = list(_shared.values())
+        _shared.clear()
+    for client in shared:
+        if hasattr(client, "close"):
+            client.close()
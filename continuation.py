@@ -0,0 +1,73 @@
+# continuation.py
+from .agent import RunContinuation
+import os
+import re
+import zlib
+
+_RUN_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class SuspendedRunStore:
+    """
+    Stores suspended runs on disk as zlib-compressed JSON, one file per run ID,
+    so a worker can drop the run while it waits for a human reply. Loading a run
+    claims it, so concurrent resumes of the same run ID execute it only once.
+    """
+
+    def __init__(self, path: str = os.path.join("~", ".agentpro", "suspended_runs"), compression_level: int = 6):
+        self.path = os.path.expanduser(path)
+        self.compression_level = compression_level
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, run_id: str) -> str:
+        if not _RUN_ID_RE.match(run_id):
+            raise ValueError(f"Invalid run ID: {run_id}")
+        return os.path.join(self.path, f"{run_id}.json.z")
+
+    def save(self, continuation: RunContinuation) -> str:
+        data = zlib.compress(continuation.model_dump_json().encode("utf-8"), self.compression_level)
+        path = self._file(continuation.run_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return continuation.run_id
+
+    def load(self, run_id: str) -> RunContinuation:
+        """
+        Claims the run and returns it. The rename is atomic, so only one caller gets
+        a given run; the others see it as missing until it is released.
+        """
+        path = self._file(run_id)
+        claimed_path = f"{path}.claimed"
+        try:
+            os.rename(path, claimed_path)
+        except FileNotFoundError:
+            raise KeyError(f"No suspended run with ID {run_id}") from None
+        try:
+            with open(claimed_path, "rb") as f:
+                return RunContinuation.model_validate_json(zlib.decompress(f.read()))
+        except Exception:
+            self.release(run_id)
+            raise
+
+    def release(self, run_id: str):
+        """
+        Returns a claimed run to the store, e.g. when resuming it failed.
+        """
+        path = self._file(run_id)
+        try:
+            os.rename(f"{path}.claimed", path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, run_id: str):
+        path = self._file(run_id)
+        for file in (path, f"{path}.claimed"):
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+
+    def list_ids(self):
+        return [name[:-len(".json.z")] for name in os.listdir(self.path) if name.endswith(".json.z")]
@@ -25,10 +25,10 @@ class QuickInternetTool(Tool):
 
     ddg: Optional[Any] = None  # Important: Declare ddg properly for Pydantic
 
-    def __init__(self, **data):
+    def __init__(self, timeout: int = 10, **data):
         super().__init__(**data)
-        # Set ddg safely even with BaseModel
-        object.__setattr__(self, 'ddg', DDGS() if DDGS_AVAILABLE else None)
+        # Set ddg safely even with BaseModel; timeout (seconds) bounds each HTTP request
+        object.__setattr__(self, 'ddg', DDGS(timeout=timeout) if DDGS_AVAILABLE else None)
 
     def run(self, input_text: Any) -> str:
         query = input_text
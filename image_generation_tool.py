@@ -1,112 +1,223 @@
-# from .base_tool import Tool
-# from typing import Any, Optional
-# import openai
-# import json
-# import os
-
-# class ImageGenerationTool(Tool):
-#     name: str = "AI Image Generator"
-#     description: str = "Generates an image from a given text prompt."
-#     action_type: str = "image_generate"
-#     input_format: str = """
-# {
-#   "prompt": "string (description of the image)",
-#   "size": "string (image resolution, e.g., '480x480')"
-# }"""
-    
-#     def __init__(self):
-#         super().__init__()
-#         ##self.api_key =  os.getenv("OPENAI_API_KEY")
-#        # openai.api_key = self.api_key
-
-#     def run(self, input_text: Any) -> str:
-#         """Generate an image using OpenAI's DALL·E model."""
-#         try:
-#             # Parse input
-#             if isinstance(input_text, str):
-#                 try:
-#                     input_data = json.loads(input_text)
-#                 except json.JSONDecodeError:
-#                     return "Error: Input must be valid JSON."
-#             else:
-#                 input_data = input_text
-            
-#             prompt = input_data.get("prompt", "")
-#             size = input_data.get("size", "480x480")
-            
-#             if not prompt:
-#                 return "Error: No prompt provided for image generation."
-            
-#             response = openai.Image.create(
-#                 model="gpt-4o",  # Adjust if needed
-#                 prompt=prompt,
-#                 n=1,
-#                 size=size,
-#                 response_format="url"
-#             )
-
-#             image_url = response["data"][0]["url"]
-#             return f"Generated Image URL: {image_url}"
-            
-#         except openai.error.OpenAIError as e:
-#             return f"API error: {str(e)}"
-#         except Exception as e:
-#             return f"Unexpected error: {str(e)}"
-
-#-----------2nd code----------------
 # image_generation_tool.py
-from .base_tool import Tool
-
-from typing import Any
+from .base_tool import InputError, Tool, ToolOutput
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import PrivateAttr
+from .client_registry import get_openai_client
 import openai
+import requests
+import base64
+import hashlib
 import json
 import os
+import re
+import threading
+
+_B64_KEY = b'"b64_json"'
+_B64_VALUE_START = re.compile(rb'\s*:\s*"')
+_MAX_HEAD_BYTES = 1 << 20  # JSON before the image data is small; stop buffering past this
+
+
+def stream_b64_json_to_file(chunks: Iterable[bytes], path: str) -> Optional[Dict[str, Any]]:
+    """
+    Decodes the first "b64_json" field of a streamed JSON response straight into `path`,
+    a few KB at a time, so the base64 payload is never held in memory.
+
+    Returns None once the image is written. If the response has no b64_json field,
+    nothing is written and the parsed JSON is returned instead (e.g. for URL responses).
+    """
+    head = b""
+    carry = b""
+    in_value = False
+    with open(path, "wb") as out:
+        for chunk in chunks:
+            if not in_value:
+                if len(head) < _MAX_HEAD_BYTES:
+                    head += chunk
+                index = head.find(_B64_KEY)
+                if index < 0:
+                    continue
+                match = _B64_VALUE_START.match(head, index + len(_B64_KEY))
+                if not match:
+                    continue  # Separator not fully received yet
+                chunk = head[match.end():]
+                in_value = True
+                head = b""
+
+            end = chunk.find(b'"')
+            # JSON may escape "/" as "\/"; base64 never contains a backslash
+            data = carry + (chunk if end < 0 else chunk[:end]).replace(b"\\", b"")
+            if end < 0:
+                usable = len(data) - len(data) % 4
+                out.write(base64.b64decode(data[:usable]))
+                carry = data[usable:]
+            else:
+                out.write(base64.b64decode(data + b"=" * (-len(data) % 4)))
+                return None
+
+    if in_value:
+        raise ValueError("Image response ended before the base64 data was complete.")
+    os.remove(path)
+    return json.loads(head or b"{}")
 
-from .base_tool import ToolOutput  # Ensure ToolOutput is imported from base_tool
 
 class ImageGenerationTool(Tool):
     name: str = "AI Image Generator"
-    description: str = "Generates an image from a given text prompt."
+    description: str = "Generates images from text prompts. Accepts one prompt or a batch of prompts generated concurrently."
     action_type: str = "image_generate"
     input_format: str = """
 {
   "prompt": "string (description of the image)",
-  "size": "string (image resolution, e.g., '480x480')"
-}"""
+  "size": "string (image resolution, e.g., '1024x1024')"
+}
+For a batch, use "prompts" (a list of strings) and either "size" (one size for all) or "sizes" (one per prompt)."""
 
-    def __init__(self):
-        super().__init__()
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+    _config: Dict[str, Any] = PrivateAttr()
 
-    def run(self, input_text: Any) -> "ToolOutput":
-        try:
-            # Parse input
-            if isinstance(input_text, str):
-                try:
-                    input_data = json.loads(input_text)
-                except json.JSONDecodeError:
-                    return ToolOutput(result="Error: Input must be valid JSON.", image_url=None)
-            else:
-                input_data = input_text
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model: str = "dall-e-3",
+                 default_size: str = "1024x1024", cache_dir: Optional[str] = None, max_workers: int = 4,
+                 timeout: int = 120, **data):
+        super().__init__(**data)
+        self._config = {
+            "model": model,
+            "default_size": default_size,
+            "cache_dir": os.path.expanduser(cache_dir or os.path.join("~", ".agentpro", "image_cache")),
+            "max_workers": max_workers,
+            "timeout": timeout,
+            "api_key": api_key or os.getenv("OPENAI_API_KEY"),
+            "base_url": base_url or os.getenv("OPENAI_BASE_URL"),
+        }
+
+    def _client(self) -> Any:
+        # Looked up per call, so the tool survives client_registry.close_http_pool()
+        return get_openai_client(
+            api_key=self._config["api_key"],
+            base_url=self._config["base_url"]
+        ).with_options(timeout=self._config["timeout"])
+
+    def _cache_path(self, prompt: str, size: str) -> str:
+        """
+        Cached images are keyed by a hash of (prompt, size, model).
+        """
+        key = hashlib.sha256(json.dumps([prompt, size, self._config["model"]]).encode("utf-8")).hexdigest()
+        return os.path.join(self._config["cache_dir"], key[:2], f"{key}.png")
+
+    def _parse_jobs(self, input_text: Any) -> List[Tuple[str, str]]:
+        if isinstance(input_text, str):
+            try:
+                input_data = json.loads(input_text)
+            except json.JSONDecodeError:
+                # A bare string is treated as a single prompt
+                input_data = {"prompt": input_text}
+        else:
+            input_data = input_text
+
+        default_size = self._config["default_size"]
+        if isinstance(input_data, list):
+            return [(item.get("prompt", ""), item.get("size", default_size)) for item in input_data]
+        if not isinstance(input_data, dict):
+            raise ValueError("Input must be a JSON object or a list of objects.")
 
-            prompt = input_data.get("prompt", "")
-            size = input_data.get("size", "480x1480")
+        if "prompts" in input_data:
+            prompts = input_data["prompts"]
+            sizes = input_data.get("sizes") or [input_data.get("size", default_size)] * len(prompts)
+            if len(sizes) != len(prompts):
+                raise ValueError("'sizes' must have one entry per prompt.")
+            return list(zip(prompts, sizes))
+        return [(input_data.get("prompt", ""), input_data.get("size", default_size))]
 
-            if not prompt:
-                return ToolOutput(result="Error: No prompt provided for image generation.", image_url=None)
+    def _generate(self, prompt: str, size: str) -> Tuple[str, Optional[str]]:
+        """
+        Returns (local path, remote URL if the API returned one). Cache hits skip the API.
+        """
+        path = self._cache_path(prompt, size)
+        if os.path.exists(path):
+            return path, None
 
-            response = openai.Image.create(
-                model="dall-e-3",
-                prompt=prompt,
-                n=1,
-                size=size,
-                response_format="url"
-            )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        params = {"model": self._config["model"], "prompt": prompt, "size": size, "n": 1}
+        if self._config["model"].startswith("dall-e"):
+            params["response_format"] = "b64_json"
 
-            image_url = response["data"][0]["url"]
-            return ToolOutput(result="Success", image_url=image_url)
+        try:
+            with self._client().images.with_streaming_response.generate(**params) as response:
+                payload = stream_b64_json_to_file(response.iter_bytes(), tmp_path)
+
+            image_url = None
+            if payload is not None:
+                # Fall back to downloading from the returned URL, still streaming to disk
+                image_url = (payload.get("data") or [{}])[0].get("url")
+                if not image_url:
+                    raise ValueError("Image API response contained neither b64_json nor url.")
+                with requests.get(image_url, stream=True, timeout=self._config["timeout"]) as download:
+                    download.raise_for_status()
+                    with open(tmp_path, "wb") as f:
+                        for block in download.iter_content(chunk_size=64 * 1024):
+                            f.write(block)
 
-        except openai.OpenAIError as e:  # Fix incorrect error reference
-            print(f"API error: {str(e)}")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path, image_url
+
+    def _generate_safe(self, prompt: str, size: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        if not prompt:
+            return None, None, "Error: No prompt provided for image generation."
+        try:
+            path, image_url = self._generate(prompt, size)
+            return path, image_url, None
+        except openai.OpenAIError as e:
+            return None, None, f"Error: Image API request failed - {e}"
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            return None, None, f"Error: Unexpected error - {e}"
+
+    def generate_batch(self, jobs: List[Tuple[str, str]]) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        Generates (prompt, size) jobs concurrently. Returns (path, url, error) per job, in order.
+        """
+        # Identical jobs in one batch are generated once
+        unique_jobs = list(dict.fromkeys(jobs))
+        with ThreadPoolExecutor(max_workers=max(1, min(self._config["max_workers"], len(unique_jobs)))) as pool:
+            results = dict(zip(unique_jobs, pool.map(lambda job: self._generate_safe(*job), unique_jobs)))
+        return [results[job] for job in jobs]
+
+    def execution_timeout(self, input_text: Any) -> Optional[float]:
+        # Jobs run max_workers at a time; each may take an API call and a download, both bounded by `timeout`
+        try:
+            jobs = set(self._parse_jobs(input_text))
+        except (ValueError, AttributeError, TypeError):
+            return None
+        waves = -(-max(len(jobs), 1) // self._config["max_workers"])
+        return 2 * self._config["timeout"] * waves
+
+    def run(self, input_text: Any) -> Union[ToolOutput, str]:
+        try:
+            jobs = self._parse_jobs(input_text)
+        except (ValueError, AttributeError, TypeError) as e:
+            return InputError(f"Error: {e}")
+        if not any(prompt for prompt, _ in jobs):
+            return InputError("Error: No prompt provided for image generation.")
+
+        results = self.generate_batch(jobs)
+
+        lines = []
+        paths = []
+        for (prompt, size), (path, image_url, error) in zip(jobs, results):
+            if error:
+                lines.append(f"- '{prompt}' ({size}): {error}")
+            else:
+                paths.append(path)
+                lines.append(f"- '{prompt}' ({size}): saved to {path}")
+
+        first_url = next((image_url for _, image_url, _ in results if image_url), None)
+        if len(jobs) == 1:
+            path, image_url, error = results[0]
+            return ToolOutput(result=error or f"Generated image saved to {path}", image_url=image_url, image_paths=paths)
+
+        summary = f"Generated {len(paths)} of {len(jobs)} images:\n" + "\n".join(lines)
+        if not paths:
+            # Nothing usable came back, so the call reads as a failure like any other tool error
+            summary = f"Error: {summary}"
+        return ToolOutput(result=summary, image_url=first_url, image_paths=paths)
@@ -0,0 +1,318 @@
+# loadtest.py
+"""
+Load generator for capacity planning. Runs N simulated users against ReactAgent with a
+stub model and stub tools whose latencies are drawn from configurable distributions,
+and reports throughput, latency percentiles, CPU and RSS.
+
+    python -m <package>.loadtest --users 50 --runs-per-user 4 --mode threaded
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import PrivateAttr
+from .base_tool import Tool
+from .model import ModelClient
+from .agent import StepStarted
+import argparse
+import asyncio
+import contextlib
+import io
+import math
+import os
+import random
+import statistics
+import threading
+import time
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    RESOURCE_AVAILABLE = False
+
+
+class LatencyDistribution:
+    """
+    Latency in seconds drawn from a distribution. Use the constructors below, e.g.
+    `LatencyDistribution.lognormal(median=0.8, sigma=0.5)` or `.fit_lognormal(samples)`
+    with latencies taken from recorded traces.
+    """
+
+    def __init__(self, sampler: Callable[[random.Random], float], description: str):
+        self._sampler = sampler
+        self.description = description
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            return max(0.0, self._sampler(self._rng))
+
+    def seed(self, seed: int) -> "LatencyDistribution":
+        self._rng.seed(seed)
+        return self
+
+    def __repr__(self):
+        return f"LatencyDistribution({self.description})"
+
+    @classmethod
+    def constant(cls, seconds: float) -> "LatencyDistribution":
+        return cls(lambda rng: seconds, f"constant {seconds}s")
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> "LatencyDistribution":
+        return cls(lambda rng: rng.uniform(low, high), f"uniform {low}-{high}s")
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float) -> "LatencyDistribution":
+        mu = math.log(median)
+        return cls(lambda rng: rng.lognormvariate(mu, sigma), f"lognormal median={median}s sigma={sigma}")
+
+    @classmethod
+    def fit_lognormal(cls, samples: Sequence[float]) -> "LatencyDistribution":
+        """
+        Fits a lognormal to observed latencies (all must be > 0).
+        """
+        logs = [math.log(x) for x in samples if x > 0]
+        if len(logs) < 2:
+            raise ValueError("Need at least two positive samples to fit a lognormal")
+        return cls.lognormal(median=math.exp(statistics.fmean(logs)), sigma=statistics.stdev(logs))
+
+
+class StubModelClient(ModelClient):
+    """
+    Scripted model: calls `tool_steps` stub tools in turn, then gives a final answer.
+    Each call sleeps for a latency drawn from `latency`.
+    """
+
+    def __init__(self, latency: LatencyDistribution, tool_action_types: Sequence[str], tool_steps: int = 2,
+                 answer_chunks: int = 8):
+        super().__init__(model_name="stub")
+        self.latency = latency
+        self.tool_action_types = list(tool_action_types)
+        self.tool_steps = tool_steps
+        self.answer_chunks = answer_chunks
+
+    def _response(self, user_prompt: str) -> str:
+        # Observations in the prompt tell us how far this run has got
+        step = user_prompt.count("\nObservation: ")
+        if step < self.tool_steps and self.tool_action_types:
+            action_type = self.tool_action_types[step % len(self.tool_action_types)]
+            return (f"Thought: I need step {step + 1}.\n"
+                    f'Action: {{"action_type": "{action_type}", "input": "load test step {step + 1}"}}')
+        return "Thought: I have everything I need.\nFinal Answer: " + "stub answer " * self.answer_chunks
+
+    def chat_completion(self, system_prompt: str, user_prompt: str,
+                        temperature: Optional[float] = None,
+                        max_tokens: Optional[int] = None) -> str:
+        time.sleep(self.latency.sample())
+        return self._response(user_prompt)
+
+    def stream_chat_completion(self, system_prompt: str, user_prompt: str,
+                               temperature: Optional[float] = None,
+                               max_tokens: Optional[int] = None):
+        # Spread the latency over the chunks, like a model generating tokens
+        text = self._response(user_prompt)
+        chunk_count = max(1, self.answer_chunks)
+        delay = self.latency.sample() / chunk_count
+        size = max(1, math.ceil(len(text) / chunk_count))
+        for start in range(0, len(text), size):
+            time.sleep(delay)
+            yield text[start:start + size]
+
+
+class StubTool(Tool):
+    name: str = "Stub Tool"
+    description: str = "Returns a canned result after a simulated delay."
+    action_type: str = "stub_tool"
+    input_format: str = "Any string."
+
+    _latency: LatencyDistribution = PrivateAttr()
+    _result: str = PrivateAttr()
+
+    def __init__(self, latency: LatencyDistribution, result_chars: int = 500, **data):
+        super().__init__(**data)
+        self._latency = latency
+        self._result = ("stub result " * (result_chars // 12 + 1))[:result_chars]
+
+    def run(self, input_text: Any) -> str:
+        time.sleep(self._latency.sample())
+        return self._result
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def _current_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _NullWriter(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+def run_load_test(users: int = 20, runs_per_user: int = 5, mode: str = "threaded",
+                  model_latency: Optional[LatencyDistribution] = None,
+                  tool_latency: Optional[LatencyDistribution] = None,
+                  tool_steps: int = 2, tool_count: int = 3, agent_kwargs: Optional[Dict[str, Any]] = None,
+                  quiet: bool = True) -> Dict[str, Any]:
+    """
+    Runs `users` simulated users, each doing `runs_per_user` agent runs back to back.
+
+    mode: "sync" (users one after another on this thread), "threaded" (one thread per
+    user) or "async" (one task per user). Sync and threaded users drive ReactAgent.stream,
+    async users ReactAgent.astream; the StepStarted events time each step.
+    Returns a report dict; see print_report().
+    """
+    from .react_agent import ReactAgent
+
+    if mode not in ("sync", "threaded", "async"):
+        raise ValueError(f"Unsupported mode: {mode}")
+
+    model_latency = model_latency or LatencyDistribution.lognormal(median=0.05, sigma=0.4)
+    tool_latency = tool_latency or LatencyDistribution.lognormal(median=0.02, sigma=0.6)
+    tools = [StubTool(latency=tool_latency, action_type=f"stub_tool_{i}", name=f"Stub Tool {i}")
+             for i in range(tool_count)]
+    model = StubModelClient(model_latency, [tool.action_type for tool in tools], tool_steps=tool_steps)
+
+    run_latencies: List[float] = []
+    step_latencies: List[float] = []
+    errors: List[str] = []
+    results_lock = threading.Lock()
+
+    def record(run_started: float, step_starts: List[float], run_finished: float, error: Optional[str]):
+        with results_lock:
+            if error:
+                errors.append(error)
+                return
+            run_latencies.append(run_finished - run_started)
+            boundaries = step_starts + [run_finished]
+            step_latencies.extend(b - a for a, b in zip(boundaries, boundaries[1:]))
+
+    def make_agent():
+        return ReactAgent(model=model, tools=tools, **(agent_kwargs or {}))
+
+    def user_sync(user: int):
+        agent = make_agent()
+        for run in range(runs_per_user):
+            started, step_starts, error = time.perf_counter(), [], None
+            try:
+                for event in agent.stream(f"user {user} run {run}"):
+                    if isinstance(event, StepStarted):
+                        step_starts.append(time.perf_counter())
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            record(started, step_starts, time.perf_counter(), error)
+
+    async def user_async(user: int):
+        agent = make_agent()
+        for run in range(runs_per_user):
+            started, step_starts, error = time.perf_counter(), [], None
+            try:
+                async for event in agent.astream(f"user {user} run {run}"):
+                    if isinstance(event, StepStarted):
+                        step_starts.append(time.perf_counter())
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            record(started, step_starts, time.perf_counter(), error)
+
+    async def run_async():
+        await asyncio.gather(*(user_async(user) for user in range(users)))
+
+    rss_before = _current_rss_mb()
+    cpu_before = time.process_time()
+    wall_started = time.perf_counter()
+
+    # The agent's debug prints would dominate CPU time under load
+    output = contextlib.redirect_stdout(_NullWriter()) if quiet else contextlib.nullcontext()
+    with output:
+        if mode == "sync":
+            for user in range(users):
+                user_sync(user)
+        elif mode == "threaded":
+            with ThreadPoolExecutor(max_workers=users) as pool:
+                list(pool.map(user_sync, range(users)))
+        else:
+            asyncio.run(run_async())
+
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_before
+    rss_after = _current_rss_mb()
+
+    report = {
+        "mode": mode,
+        "users": users,
+        "runs": len(run_latencies),
+        "errors": len(errors),
+        "wall_seconds": wall,
+        "runs_per_second": len(run_latencies) / wall if wall else 0.0,
+        "steps_per_second": len(step_latencies) / wall if wall else 0.0,
+        "run_p50": _percentile(run_latencies, 50),
+        "run_p95": _percentile(run_latencies, 95),
+        "run_p99": _percentile(run_latencies, 99),
+        "step_p50": _percentile(step_latencies, 50),
+        "step_p95": _percentile(step_latencies, 95),
+        "step_p99": _percentile(step_latencies, 99),
+        "cpu_seconds": cpu,
+        "cpu_utilization": cpu / wall if wall else 0.0,
+        "rss_mb": rss_after,
+        "rss_growth_mb": (rss_after - rss_before) if (rss_after is not None and rss_before is not None) else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if RESOURCE_AVAILABLE else None,
+        "first_errors": errors[:5],
+    }
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    def ms(seconds: float) -> str:
+        return f"{seconds * 1000:8.1f} ms"
+
+    def mb(value: Optional[float]) -> str:
+        return f"{value:8.1f} MB" if value is not None else "     n/a"
+
+    print(f"=== {report['mode']}: {report['users']} users, {report['runs']} runs, {report['errors']} errors "
+          f"in {report['wall_seconds']:.2f}s")
+    print(f"  throughput: {report['runs_per_second']:8.2f} runs/s  {report['steps_per_second']:8.2f} steps/s")
+    print(f"  run  p50 {ms(report['run_p50'])}  p95 {ms(report['run_p95'])}  p99 {ms(report['run_p99'])}")
+    print(f"  step p50 {ms(report['step_p50'])}  p95 {ms(report['step_p95'])}  p99 {ms(report['step_p99'])}")
+    print(f"  cpu  {report['cpu_seconds']:.2f}s ({report['cpu_utilization'] * 100:.0f}% of one core)")
+    print(f"  rss  {mb(report['rss_mb'])}  growth {mb(report['rss_growth_mb'])}  peak {mb(report['peak_rss_mb'])}")
+    for error in report["first_errors"]:
+        print(f"  error: {error}")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test ReactAgent with stub model and tools.")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--runs-per-user", type=int, default=5)
+    parser.add_argument("--mode", choices=["sync", "threaded", "async", "all"], default="all")
+    parser.add_argument("--model-median", type=float, default=0.05, help="Median LLM latency in seconds")
+    parser.add_argument("--model-sigma", type=float, default=0.4)
+    parser.add_argument("--tool-median", type=float, default=0.02, help="Median tool latency in seconds")
+    parser.add_argument("--tool-sigma", type=float, default=0.6)
+    parser.add_argument("--tool-steps", type=int, default=2, help="Tool calls per run before the final answer")
+    args = parser.parse_args(argv)
+
+    modes = ["sync", "threaded", "async"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        print_report(run_load_test(
+            users=args.users,
+            runs_per_user=args.runs_per_user,
+            mode=mode,
+            model_latency=LatencyDistribution.lognormal(args.model_median, args.model_sigma),
+            tool_latency=LatencyDistribution.lognormal(args.tool_median, args.tool_sigma),
+            tool_steps=args.tool_steps,
+        ))
+
+
+if __name__ == "__main__":
+    main()
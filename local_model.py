@@ -0,0 +1,159 @@
+# local_model.py
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from .model import ModelClient
+import os
+import threading
+import time
+
+# Try importing llama-cpp-python for local GGUF inference
+try:
+    import llama_cpp
+    LLAMA_CPP_AVAILABLE = True
+except ImportError:
+    LLAMA_CPP_AVAILABLE = False
+
+
+class _LoadedModel:
+    """
+    A GGUF model loaded once per process, plus the saved KV states of recent
+    system-prompt prefixes. All access goes through `lock`; llama.cpp contexts are
+    not thread-safe.
+    """
+
+    def __init__(self, llm: Any, load_seconds: float, max_prefix_states: int):
+        self.llm = llm
+        self.lock = threading.Lock()
+        self.max_prefix_states = max_prefix_states
+        self.prefix_states: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.stats: Dict[str, float] = {
+            "load_seconds": load_seconds,
+            "warmup_seconds": 0.0,
+            "prefix_hits": 0,
+            "prefix_misses": 0,
+            "prompt_tokens_reused": 0,
+            "prompt_tokens_evaluated": 0,
+        }
+
+    def warmup(self):
+        started = time.perf_counter()
+        self.llm.eval(self.llm.tokenize(b"Hello", add_bos=True))
+        self.llm.reset()
+        self.stats["warmup_seconds"] = time.perf_counter() - started
+
+    def _cached_tokens(self) -> List[int]:
+        return self.llm.input_ids[:self.llm.n_tokens].tolist()
+
+    def restore_prefix(self, prefix_tokens: List[int]):
+        """
+        Makes sure the context starts with the evaluated prefix: reuse what is already
+        in the KV cache, else load a saved state, else evaluate and save it.
+        """
+        key = tuple(prefix_tokens)
+        if self._cached_tokens()[:len(prefix_tokens)] == prefix_tokens:
+            self.stats["prefix_hits"] += 1
+            return
+
+        state = self.prefix_states.get(key)
+        if state is not None:
+            self.prefix_states.move_to_end(key)
+            self.llm.load_state(state)
+            self.stats["prefix_hits"] += 1
+            return
+
+        self.stats["prefix_misses"] += 1
+        self.llm.reset()
+        self.llm.eval(prefix_tokens)
+        self.prefix_states[key] = self.llm.save_state()
+        if len(self.prefix_states) > self.max_prefix_states:
+            self.prefix_states.popitem(last=False)
+
+    def count_reuse(self, tokens: List[int]):
+        cached = self._cached_tokens()
+        common = 0
+        for a, b in zip(cached, tokens):
+            if a != b:
+                break
+            common += 1
+        self.stats["prompt_tokens_reused"] += common
+        self.stats["prompt_tokens_evaluated"] += len(tokens) - common
+
+
+_MODELS: Dict[tuple, _LoadedModel] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def load_local_model(model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None,
+                     max_prefix_states: int = 4, warmup: bool = True, **llama_kwargs) -> _LoadedModel:
+    """
+    Loads a GGUF model once per process; later calls with the same settings share it.
+    """
+    if not LLAMA_CPP_AVAILABLE:
+        raise ImportError("The local provider requires llama-cpp-python. Install it with `pip install llama-cpp-python`.")
+
+    model_path = os.path.abspath(os.path.expanduser(model_path))
+    key = (model_path, n_ctx, n_threads, tuple(sorted(llama_kwargs.items())))
+    with _MODELS_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            started = time.perf_counter()
+            llm = llama_cpp.Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False, **llama_kwargs)
+            model = _LoadedModel(llm, time.perf_counter() - started, max_prefix_states)
+            if warmup:
+                model.warmup()
+            _MODELS[key] = model
+        return model
+
+
+def local_model_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Load/warmup timings and prefix-reuse counters for every model loaded in this process.
+    """
+    with _MODELS_LOCK:
+        return {os.path.basename(key[0]): dict(model.stats) for key, model in _MODELS.items()}
+
+
+class LocalLlamaClient(ModelClient):
+    """
+    Offline client running GGUF models on the CPU through llama-cpp-python.
+
+    The prompt is split into a static prefix (chat template + system prompt) and a
+    per-step suffix. The evaluated KV state of each recent prefix is saved, so steps
+    and sessions sharing a system prompt only evaluate the new suffix tokens.
+    """
+
+    # ChatML; the prefix ends where the per-step user content starts
+    DEFAULT_PREFIX_TEMPLATE = "<|im_start|>system\n{system}<|im_end|>\n<|im_start|>user\n"
+    DEFAULT_SUFFIX_TEMPLATE = "{user}<|im_end|>\n<|im_start|>assistant\n"
+
+    def __init__(self, model_path: str, model_name: str = None, temperature: float = 0.7,
+                 max_tokens: Optional[int] = None, n_ctx: int = 4096, n_threads: Optional[int] = None,
+                 prefix_template: str = None, suffix_template: str = None, stop: Optional[List[str]] = None,
+                 max_prefix_states: int = 4, warmup: bool = True, **llama_kwargs):
+        super().__init__(model_name=model_name or os.path.basename(model_path), temperature=temperature,
+                         max_tokens=max_tokens)
+        self.model = load_local_model(model_path, n_ctx=n_ctx, n_threads=n_threads,
+                                      max_prefix_states=max_prefix_states, warmup=warmup, **llama_kwargs)
+        self.prefix_template = prefix_template or self.DEFAULT_PREFIX_TEMPLATE
+        self.suffix_template = suffix_template or self.DEFAULT_SUFFIX_TEMPLATE
+        self.stop = stop if stop is not None else ["<|im_end|>"]
+
+    def chat_completion(self, system_prompt: str, user_prompt: str,
+                       temperature: Optional[float] = None,
+                       max_tokens: Optional[int] = None) -> str:
+        temp = temperature if temperature is not None else self.temperature
+        tokens = max_tokens if max_tokens is not None else self.max_tokens
+
+        llm = self.model.llm
+        prefix = self.prefix_template.format(system=system_prompt).encode("utf-8")
+        suffix = self.suffix_template.format(user=user_prompt).encode("utf-8")
+
+        with self.model.lock:
+            prefix_tokens = llm.tokenize(prefix, add_bos=True, special=True)
+            prompt_tokens = prefix_tokens + llm.tokenize(suffix, add_bos=False, special=True)
+            self.model.restore_prefix(prefix_tokens)
+            self.model.count_reuse(prompt_tokens)
+            # llama.cpp only evaluates tokens after the longest prefix already in the KV cache
+            response = llm.create_completion(prompt=prompt_tokens, temperature=temp, max_tokens=tokens, stop=self.stop)
+
+        return response["choices"][0]["text"]
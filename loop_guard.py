@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import time
+
+
+class ActionDeduper:
+    """
+    Remembers the observation of every (action_type, input) pair executed in a run,
+    so identical actions are answered from the run's own history instead of
+    re-running the tool. Flags exact repeats and short A-B-A-B style cycles.
+    """
+
+    def __init__(self, max_repeats: int = 2, max_cycle_length: int = 3):
+        self.max_repeats = max_repeats
+        self.max_cycle_length = max_cycle_length
+        self.observations: Dict[Tuple[str, str], Any] = {}
+        self.repeat_counts: Dict[Tuple[str, str], int] = {}
+        self.history: List[Tuple[str, str]] = []
+
+    @staticmethod
+    def key(action_type: str, action_input: Any) -> Tuple[str, str]:
+        return action_type, json.dumps(action_input, sort_keys=True, default=str)
+
+    def lookup(self, action_type: str, action_input: Any) -> Tuple[bool, Any]:
+        """
+        Records the action and returns (hit, cached observation). Repeats are counted
+        even when nothing was stored, so retrying a failing action still earns a hint.
+        """
+        key = self.key(action_type, action_input)
+        if key in self.history:
+            self.repeat_counts[key] = self.repeat_counts.get(key, 0) + 1
+        self.history.append(key)
+        if key in self.observations:
+            return True, self.observations[key]
+        return False, None
+
+    def store(self, action_type: str, action_input: Any, result: Any):
+        self.observations[self.key(action_type, action_input)] = result
+
+    def _cycle_length(self) -> int:
+        # Length L of a cycle if the last 2*L actions are the same L actions twice (L >= 2)
+        for length in range(2, self.max_cycle_length + 1):
+            if len(self.history) >= 2 * length and self.history[-length:] == self.history[-2 * length:-length]:
+                return length
+        return 0
+
+    def corrective_hint(self, action_type: str, action_input: Any) -> Optional[str]:
+        """
+        Returns a hint for the model once an action has been repeated too often or
+        the run is cycling between the same few actions.
+        """
+        repeats = self.repeat_counts.get(self.key(action_type, action_input), 0)
+        if repeats >= self.max_repeats:
+            return (
+                f"You have already run this exact action {repeats + 1} times. "
+                "Do not repeat it. Use a different action or input, or give the Final Answer with what you know."
+            )
+        cycle = self._cycle_length()
+        if cycle:
+            return (
+                f"You are cycling through the same {cycle} actions without making progress. "
+                "Change your approach, or give the Final Answer with what you know."
+            )
+        return None
+
+
+class RunBudget:
+    """
+    Wall-clock deadline and token budget for a single agent run.
+    """
+
+    def __init__(self, max_seconds: Optional[float] = None, max_tokens: Optional[int] = None,
+                 elapsed: float = 0.0, tokens_used: int = 0):
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        # A resumed run carries over the time and tokens it had already spent
+        self.started_at = time.monotonic() - elapsed
+        self.tokens_used = tokens_used
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining_seconds(self) -> Optional[float]:
+        """
+        Time left before the deadline, or None without one. Tool calls are capped by it.
+        """
+        if self.max_seconds is None:
+            return None
+        return max(self.max_seconds - self.elapsed, 0.0)
+
+    def add_tokens(self, count: int):
+        self.tokens_used += count
+
+    def exceeded(self, next_tokens: int = 0) -> Optional[str]:
+        """
+        Returns the reason the run must stop, or None. `next_tokens` is the size of the
+        prompt about to be sent, so a call that would overshoot the budget is never made.
+        """
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            return f"wall-clock deadline of {self.max_seconds:g}s reached"
+        if self.max_tokens is not None and self.tokens_used + next_tokens > self.max_tokens:
+            return f"token budget of {self.max_tokens} tokens reached"
+        return None
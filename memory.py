@@ -0,0 +1,290 @@
+# memory.py
+from typing import Any, Callable, Dict, List, Optional
+from .agent import AgentResponse
+from .tool_index import tokenize
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+# Try importing numpy for the embedding matrix
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class HashingEmbedder:
+    """
+    Offline embedding using the hashing trick over words and word bigrams.
+    Stable across processes, so stored vectors stay valid between sessions.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, (1.0 if (value >> 63) & 1 else -1.0)
+
+    def __call__(self, texts: List[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = tokenize(text)
+            for feature in terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]:
+                index, sign = self._bucket(feature)
+                vectors[row, index] += sign
+        return vectors
+
+
+class MemoryStore:
+    """
+    Persistent long-term memory shared across agent runs.
+
+    Distilled facts are kept as rows of a compact embedding matrix (float16, or int8
+    with one float32 scale per row) plus an ID map and JSON metadata on disk. The
+    store is bounded by `max_items`; when full, the least valuable memories are
+    evicted, scored by how recently and how often they were retrieved.
+
+    One store can be shared by concurrent sessions; all access goes through a lock.
+    """
+
+    def __init__(self, path: str = os.path.join("~", ".agentpro", "memory"), dim: int = 256,
+                 dtype: str = "float16", max_items: int = 5000,
+                 embed_fn: Optional[Callable[[List[str]], Any]] = None,
+                 usage_weight_seconds: float = 86400.0, autosave: bool = True):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("MemoryStore requires numpy. Install it with `pip install numpy`.")
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported memory dtype: {dtype}")
+
+        self.path = os.path.expanduser(path)
+        self.dtype = dtype
+        self.max_items = max_items
+        self.embed_fn = embed_fn or HashingEmbedder(dim)
+        self.dim = dim if embed_fn is None else None  # Learned from the first embedding otherwise
+        # A retrieval is worth this many seconds of recency when ranking for eviction
+        self.usage_weight_seconds = usage_weight_seconds
+        self.autosave = autosave
+
+        self._matrix = None  # (capacity, dim) float16 or int8
+        self._scales = None  # (capacity,) float32, only for int8
+        self._ids: List[str] = []  # row -> id
+        self._rows: Dict[str, int] = {}  # id -> row
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+        self.load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    # ---------- Encoding ----------
+
+    def _embed(self, texts: List[str]) -> "np.ndarray":
+        vectors = np.asarray(self.embed_fn(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_capacity(self, rows: int, dim: int):
+        if self._matrix is None:
+            self.dim = dim
+            self._matrix = np.zeros((max(rows, 64), dim), dtype=self.dtype)
+            self._scales = np.ones(self._matrix.shape[0], dtype=np.float32)
+        elif rows > self._matrix.shape[0]:
+            capacity = max(rows, self._matrix.shape[0] * 2)
+            matrix = np.zeros((capacity, self.dim), dtype=self.dtype)
+            matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:len(self._ids)] = self._scales[:len(self._ids)]
+            self._matrix, self._scales = matrix, scales
+
+    def _write_row(self, row: int, vector: "np.ndarray"):
+        if self.dtype == "int8":
+            scale = float(np.abs(vector).max()) / 127.0 or 1.0
+            self._matrix[row] = np.round(vector / scale).astype(np.int8)
+            self._scales[row] = scale
+        else:
+            self._matrix[row] = vector.astype(np.float16)
+
+    def _similarities(self, query_vector: "np.ndarray") -> "np.ndarray":
+        count = len(self._ids)
+        scores = self._matrix[:count].astype(np.float32) @ query_vector
+        if self.dtype == "int8":
+            scores *= self._scales[:count]
+        return scores
+
+    # ---------- Public API ----------
+
+    def add(self, text: str, metadata: Optional[Dict[str, Any]] = None, save: bool = True) -> str:
+        """
+        Stores a memory and returns its ID. Adding the same text again refreshes it.
+        """
+        with self._lock:
+            memory_id = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+            now = time.time()
+
+            if memory_id in self._records:
+                self._records[memory_id]["last_used"] = now
+            else:
+                vector = self._embed([text])[0]
+                self._ensure_capacity(len(self._ids) + 1, vector.shape[0])
+                row = len(self._ids)
+                self._write_row(row, vector)
+                self._ids.append(memory_id)
+                self._rows[memory_id] = row
+                self._records[memory_id] = {
+                    "text": text,
+                    "metadata": metadata or {},
+                    "created": now,
+                    "last_used": now,
+                    "use_count": 0,
+                }
+                if len(self._ids) > self.max_items:
+                    self._evict()
+
+            if save and self.autosave:
+                self.save()
+            return memory_id
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.2) -> List[Dict[str, Any]]:
+        """
+        Returns up to k memories most similar to the query, best first. Returned
+        memories count as used, which protects them from eviction.
+        """
+        if k <= 0:
+            return []
+        # Embed outside the lock; only the matrix scan needs it
+        query_vector = self._embed([query])[0]
+        with self._lock:
+            if not self._ids:
+                return []
+
+            scores = self._similarities(query_vector)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            now = time.time()
+            results = []
+            for row in top:
+                score = float(scores[row])
+                if score < min_score:
+                    break
+                record = self._records[self._ids[row]]
+                record["last_used"] = now
+                record["use_count"] += 1
+                results.append({"id": self._ids[row], "text": record["text"], "metadata": record["metadata"], "score": score})
+            return results
+
+    def remember(self, query: str, response: AgentResponse, max_chars: int = 500) -> List[str]:
+        """
+        Distills a finished run into memories: the question with its final answer,
+        plus the result of every successful tool call.
+        """
+        with self._lock:
+            memory_ids = []
+            for step in response.thought_process:
+                if not (step.action and step.observation):
+                    continue
+                result = str(step.observation.result)
+                if result.startswith(("Error", "❌")):
+                    continue
+                action_input = json.dumps(step.action.input, default=str)
+                memory_ids.append(self.add(
+                    f"{step.action.action_type}({action_input}) returned: {result[:max_chars]}",
+                    {"kind": "observation", "query": query},
+                    save=False
+                ))
+
+            answer = response.final_answer or ""
+            if answer and not answer.startswith(("❌", "⚠️")):
+                memory_ids.append(self.add(f"Q: {query}\nA: {answer[:max_chars]}", {"kind": "answer", "query": query}, save=False))
+
+            if self.autosave:
+                self.save()
+            return memory_ids
+
+    def delete(self, memory_id: str):
+        with self._lock:
+            self._remove({memory_id})
+            if self.autosave:
+                self.save()
+
+    def _retention_score(self, memory_id: str) -> float:
+        record = self._records[memory_id]
+        return record["last_used"] + self.usage_weight_seconds * math.log1p(record["use_count"])
+
+    def _evict(self):
+        # Evict down to 90% of capacity so eviction cost is amortised over many adds
+        target = int(self.max_items * 0.9)
+        ranked = sorted(self._ids, key=self._retention_score)
+        self._remove(set(ranked[:len(self._ids) - target]))
+
+    def _remove(self, memory_ids: set):
+        keep = [row for row, memory_id in enumerate(self._ids) if memory_id not in memory_ids]
+        count = len(keep)
+        self._matrix[:count] = self._matrix[keep]
+        self._scales[:count] = self._scales[keep]
+        self._ids = [self._ids[row] for row in keep]
+        self._rows = {memory_id: row for row, memory_id in enumerate(self._ids)}
+        for memory_id in memory_ids:
+            self._records.pop(memory_id, None)
+
+    # ---------- Persistence ----------
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            count = len(self._ids)
+            matrix = self._matrix[:count] if self._matrix is not None else np.zeros((0, self.dim or 0), dtype=self.dtype)
+            scales = self._scales[:count] if self._scales is not None else np.zeros(0, dtype=np.float32)
+            index = json.dumps({"dtype": self.dtype, "ids": self._ids, "records": self._records}).encode("utf-8")
+
+            # Vectors and index go in one file replaced in a single step, so a crash or a
+            # concurrent save never leaves them out of sync. The temp name is unique so
+            # other processes saving the same store can't clobber it
+            tmp_path = os.path.join(self.path, f"memory.{uuid.uuid4().hex}.tmp.npz")
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, matrix=matrix, scales=scales, index=np.frombuffer(index, dtype=np.uint8))
+                os.replace(tmp_path, os.path.join(self.path, "memory.npz"))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def load(self):
+        with self._lock:
+            store_path = os.path.join(self.path, "memory.npz")
+            if not os.path.exists(store_path):
+                return
+
+            with np.load(store_path) as data:
+                matrix, scales = data["matrix"], data["scales"]
+                index = json.loads(data["index"].tobytes().decode("utf-8"))
+            if index.get("dtype") != self.dtype:
+                raise ValueError(f"Memory store at {self.path} uses {index.get('dtype')}, not {self.dtype}")
+            if matrix.shape[0] != len(index["ids"]) or scales.shape[0] != len(index["ids"]):
+                raise ValueError(f"Memory store at {self.path} is corrupt: {matrix.shape[0]} vectors "
+                                 f"for {len(index['ids'])} ids")
+
+            self._ids = index["ids"]
+            self._rows = {memory_id: row for row, memory_id in enumerate(self._ids)}
+            self._records = index["records"]
+            if len(self._ids):
+                self._ensure_capacity(len(self._ids), matrix.shape[1])
+                self._matrix[:len(self._ids)] = matrix
+                self._scales[:len(self._ids)] = scales
+
+    def format_for_prompt(self, memories: List[Dict[str, Any]]) -> str:
+        if not memories:
+            return ""
+        lines = "\n".join(f"- {memory['text']}" for memory in memories)
+        return f"Relevant memories from earlier sessions (may be outdated):\n{lines}\n"
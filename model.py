@@ -1,9 +1,32 @@
 # model.py
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Iterator, Optional, List, Union
 import openai
 import litellm
 from litellm import completion
+from concurrent.futures import Future, ThreadPoolExecutor
+from .client_registry import get_http_client, get_openai_client, get_shared_client
 import os
+import queue
+import threading
+import time
+
+# Try importing tiktoken for exact token counts
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Counts prompt tokens with tiktoken when available, otherwise estimates ~4 characters per token.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
 
 class ModelClient:
     """Base class for different model clients"""
@@ -20,12 +43,27 @@ class ModelClient:
         """
         raise NotImplementedError("Subclasses must implement this method")
 
+    def stream_chat_completion(self, system_prompt: str, user_prompt: str,
+                               temperature: Optional[float] = None,
+                               max_tokens: Optional[int] = None) -> Iterator[str]:
+        """
+        Yields the response as text deltas. Clients without native streaming yield it in one piece.
+        """
+        yield self.chat_completion(system_prompt, user_prompt, temperature=temperature, max_tokens=max_tokens)
+
 class OpenAIClient(ModelClient):
     """Client for OpenAI models"""
     def __init__(self, api_key: str = None, model_name: str = "gpt-4o", 
-                 temperature: float = 0.7, max_tokens: Optional[int] = None):
+                 temperature: float = 0.7, max_tokens: Optional[int] = None, base_url: str = None):
         super().__init__(model_name=model_name, temperature=temperature, max_tokens=max_tokens)
-        self.client = openai.OpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"))
+        self.api_key = api_key
+        self.base_url = base_url
+
+    @property
+    def client(self):
+        # Shared per (provider, api_key, base_url); the HTTP pool is shared process-wide.
+        # Looked up per call, so the handle survives close_http_pool()
+        return get_openai_client(api_key=self.api_key, base_url=self.base_url)
     
     def chat_completion(self, system_prompt: str, user_prompt: str, 
                        temperature: Optional[float] = None, 
@@ -44,6 +82,30 @@ class OpenAIClient(ModelClient):
             max_tokens=tokens
         )
         return response.choices[0].message.content
+
+    def stream_chat_completion(self, system_prompt: str, user_prompt: str,
+                               temperature: Optional[float] = None,
+                               max_tokens: Optional[int] = None) -> Iterator[str]:
+        temp = temperature if temperature is not None else self.temperature
+        tokens = max_tokens if max_tokens is not None else self.max_tokens
+
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temp,
+            max_tokens=tokens,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Closing early (e.g. a cancelled run) stops generation on the server
+            stream.close()
         
 
 class LiteLLMClient(ModelClient):
@@ -52,17 +114,16 @@ class LiteLLMClient(ModelClient):
                  litellm_provider: str = None, temperature: float = 0.7, 
                  max_tokens: Optional[int] = None):
         super().__init__(model_name=model_name, temperature=temperature, max_tokens=max_tokens)
+        # The key is passed per request instead of being written to os.environ, which is
+        # shared by every client in the process; without one LiteLLM reads the provider's env var
         self.api_key = api_key
         self.litellm_provider = litellm_provider
-        
-        # Set up API key for the specified provider
-        if self.litellm_provider == "openai":
-            os.environ["OPENAI_API_KEY"] = self.api_key or os.environ.get("OPENAI_API_KEY", "")
-        elif self.litellm_provider == "anthropic":
-            os.environ["ANTHROPIC_API_KEY"] = self.api_key or os.environ.get("ANTHROPIC_API_KEY", "")
-        elif self.litellm_provider == "openrouter":
-            os.environ["OPENROUTER_API_KEY"] = self.api_key or os.environ.get("OPENROUTER_API_KEY", "")
-        # Add other providers as needed
+
+    def _use_shared_session(self):
+        # Route LiteLLM's OpenAI-compatible calls through the shared HTTP pool; checked per
+        # call because close_http_pool() resets the session
+        if litellm.client_session is None:
+            litellm.client_session = get_http_client()
     
     def chat_completion(self, system_prompt: str, user_prompt: str, 
                        temperature: Optional[float] = None, 
@@ -70,6 +131,7 @@ class LiteLLMClient(ModelClient):
         # Use provided parameters or fall back to instance defaults
         temp = temperature if temperature is not None else self.temperature
         tokens = max_tokens if max_tokens is not None else self.max_tokens
+        self._use_shared_session()
         
         messages = [
             {"role": "system", "content": system_prompt},
@@ -87,11 +149,182 @@ class LiteLLMClient(ModelClient):
             model=model_param,
             messages=messages,
             temperature=temp,
-            max_tokens=tokens
+            max_tokens=tokens,
+            api_key=self.api_key
         )
         
         return response.choices[0].message.content
 
+    def stream_chat_completion(self, system_prompt: str, user_prompt: str,
+                               temperature: Optional[float] = None,
+                               max_tokens: Optional[int] = None) -> Iterator[str]:
+        temp = temperature if temperature is not None else self.temperature
+        tokens = max_tokens if max_tokens is not None else self.max_tokens
+
+        model_param = self.model_name
+        if self.litellm_provider and self.litellm_provider not in self.model_name:
+            model_param = f"{self.litellm_provider}/{self.model_name}"
+
+        self._use_shared_session()
+        for chunk in litellm.completion(
+            model=model_param,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temp,
+            max_tokens=tokens,
+            api_key=self.api_key,
+            stream=True
+        ):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class _RequestBatcher:
+    """
+    Collects concurrent completion requests for one server and model for up to
+    `batch_window_ms`, or until `max_batch_size` are waiting, and sends each group as
+    one /v1/completions request with a list of prompts. Each choice is routed back to
+    its caller by index. One instance per settings is shared through the client registry.
+    """
+
+    def __init__(self, base_url: str, api_key: str, model_name: str, batch_window_ms: float,
+                 max_batch_size: int, max_inflight_batches: int, timeout: float):
+        self.client = get_openai_client(api_key=api_key, base_url=base_url, provider="batching").with_options(timeout=timeout)
+        self.model_name = model_name
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._senders = ThreadPoolExecutor(max_workers=max_inflight_batches, thread_name_prefix="llm-batch")
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect_loop, name="llm-batch-collector", daemon=True)
+        self._collector.start()
+
+    def submit(self, prompt: str, temperature: float, max_tokens: int, stop: Optional[List[str]]) -> Future:
+        if self._closed:
+            raise RuntimeError("Request batcher is closed")
+        future: Future = Future()
+        self._queue.put((prompt, temperature, max_tokens, tuple(stop) if stop else None, future))
+        return future
+
+    def _collect_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Let the outer loop exit after this batch
+                    break
+                batch.append(item)
+
+            # Prompts in one server call share sampling parameters
+            groups: Dict[tuple, list] = {}
+            for prompt, temp, tokens, stop, future in batch:
+                groups.setdefault((temp, tokens, stop), []).append((prompt, future))
+            for (temp, tokens, stop), pending in groups.items():
+                self._senders.submit(self._send_batch, pending, temp, tokens, stop)
+
+    def _send_batch(self, pending: list, temperature: float, max_tokens: int, stop: Optional[tuple]):
+        try:
+            response = self.client.completions.create(
+                model=self.model_name,
+                prompt=[prompt for prompt, _ in pending],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=list(stop) if stop else None
+            )
+            texts: Dict[int, str] = {choice.index: choice.text for choice in response.choices}
+            for index, (_, future) in enumerate(pending):
+                if index in texts:
+                    future.set_result(texts[index])
+                else:
+                    future.set_exception(RuntimeError(f"Batched response has no choice for prompt {index}"))
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+    def close(self):
+        """
+        Stops the collector after pending requests are sent.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._collector.join()
+            self._senders.shutdown(wait=True)
+
+
+class BatchingClient(ModelClient):
+    """
+    Client for self-hosted, OpenAI-compatible inference servers that batch.
+
+    A lightweight handle: concurrent chat_completion calls from every BatchingClient
+    with the same server, key, model and batching settings go through one shared
+    request batcher (see _RequestBatcher), so sessions are batched together even when
+    each agent creates its own client. Prompts are rendered with `prompt_template`.
+    """
+
+    # ChatML, understood by most local chat models; override for other templates
+    DEFAULT_PROMPT_TEMPLATE = (
+        "<|im_start|>system\n{system}<|im_end|>\n"
+        "<|im_start|>user\n{user}<|im_end|>\n"
+        "<|im_start|>assistant\n"
+    )
+
+    def __init__(self, base_url: str, api_key: str = None, model_name: str = "local-model",
+                 temperature: float = 0.7, max_tokens: Optional[int] = None,
+                 batch_window_ms: float = 10.0, max_batch_size: int = 16, max_inflight_batches: int = 2,
+                 prompt_template: str = None, stop: Optional[List[str]] = None, timeout: float = 120.0):
+        super().__init__(model_name=model_name, temperature=temperature, max_tokens=max_tokens)
+        self.prompt_template = prompt_template or self.DEFAULT_PROMPT_TEMPLATE
+        self.stop = stop if stop is not None else (["<|im_end|>"] if prompt_template is None else None)
+        self._batcher_settings = {
+            "base_url": base_url,
+            "api_key": api_key or os.environ.get("OPENAI_API_KEY", "not-needed"),
+            "model_name": model_name,
+            "batch_window_ms": batch_window_ms,
+            "max_batch_size": max_batch_size,
+            "max_inflight_batches": max_inflight_batches,
+            "timeout": timeout,
+        }
+        self._batcher_key = ("batcher",) + tuple(self._batcher_settings.values())
+        self._closed = False
+
+    def _batcher(self) -> _RequestBatcher:
+        # Looked up per call, so handles survive close_http_pool() and pick up a fresh batcher
+        return get_shared_client(self._batcher_key, lambda: _RequestBatcher(**self._batcher_settings))
+
+    def chat_completion(self, system_prompt: str, user_prompt: str, 
+                       temperature: Optional[float] = None, 
+                       max_tokens: Optional[int] = None) -> str:
+        if self._closed:
+            raise RuntimeError("BatchingClient is closed")
+        temp = temperature if temperature is not None else self.temperature
+        tokens = max_tokens if max_tokens is not None else self.max_tokens
+
+        prompt = self.prompt_template.format(system=system_prompt, user=user_prompt)
+        return self._batcher().submit(prompt, temp, tokens, self.stop).result()
+
+    def close(self):
+        """
+        Closes this handle. The shared batcher keeps serving other handles; it is
+        stopped by client_registry.close_http_pool().
+        """
+        self._closed = True
+
+
 class ModelConfig:
     """Configuration class for a LLM model"""
     def __init__(
@@ -101,7 +334,9 @@ class ModelConfig:
         api_key: str = None,
         litellm_provider: str = None,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        base_url: str = None,
+        **client_options
     ):
         self.provider = provider.lower()
         self.model_name = model_name
@@ -109,6 +344,8 @@ class ModelConfig:
         self.litellm_provider = litellm_provider
         self.temperature = temperature
         self.max_tokens = max_tokens or 2048  # Default max_tokens
+        self.base_url = base_url  # For self-hosted, OpenAI-compatible servers
+        self.client_options = client_options  # Provider-specific options (e.g. batch_window_ms)
         
         # Set defaults based on provider
         if not self.model_name:
@@ -116,6 +353,8 @@ class ModelConfig:
                 self.model_name = "gpt-4o"
             elif self.provider == "litellm":
                 self.model_name = "gpt-4o"
+            elif self.provider == "batching":
+                self.model_name = "local-model"
         
     def create_client(self) -> ModelClient:
         """Create and return a model client based on this configuration"""
@@ -124,7 +363,8 @@ class ModelConfig:
                 api_key=self.api_key, 
                 model_name=self.model_name,
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=self.max_tokens,
+                base_url=self.base_url
             )
         elif self.provider == "litellm":
             return LiteLLMClient(
@@ -134,6 +374,28 @@ class ModelConfig:
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
+        elif self.provider == "batching":
+            if not self.base_url:
+                raise ValueError("The batching provider requires base_url")
+            return BatchingClient(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                model_name=self.model_name,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                **self.client_options
+            )
+        elif self.provider == "local":
+            # Imported lazily so llama-cpp-python stays an optional dependency
+            from .local_model import LocalLlamaClient
+            if "model_path" not in self.client_options:
+                raise ValueError("The local provider requires model_path")
+            return LocalLlamaClient(
+                model_name=self.model_name,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                **self.client_options
+            )
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
 
@@ -143,18 +405,23 @@ def create_model(
     api_key: str = None,
     litellm_provider: str = None,
     temperature: float = 0.7,
-    max_tokens: Optional[int] = None
+    max_tokens: Optional[int] = None,
+    base_url: str = None,
+    **client_options
 ) -> ModelClient:
     """
     Create and return a model client with the specified configuration
     
     Args:
-        provider: The LLM provider (openai, litellm)
+        provider: The LLM provider (openai, litellm, batching, local)
         model_name: The specific model to use
         api_key: The API key for the provider
         litellm_provider: For litellm, the specific provider to use
         temperature: The temperature parameter for the model (default: 0.7)
         max_tokens: The maximum tokens for the model (default: 2048)
+        base_url: Base URL of an OpenAI-compatible server (openai, batching)
+        client_options: Provider-specific options, e.g. batch_window_ms and max_batch_size for batching,
+            or model_path, n_ctx and n_threads for local
         
     Returns:
         ModelClient: A configured model client
@@ -165,6 +432,8 @@ def create_model(
         api_key=api_key,
         litellm_provider=litellm_provider,
         temperature=temperature,
-        max_tokens=max_tokens
+        max_tokens=max_tokens,
+        base_url=base_url,
+        **client_options
     )
     return config.create_client()
\ No newline at end of file
@@ -0,0 +1,280 @@
+# plan_execute.py
+from typing import Any, Dict, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .agent import Action, StepStarted, ThoughtEvent, ActionDispatched, ObservationReceived, AnswerDelta
+from .react_agent import ReactAgent
+from .loop_guard import ActionDeduper, RunBudget
+from .trace import CompactTrace
+import json
+import re
+
+_REFERENCE_RE = re.compile(r"\{\{\s*([A-Za-z0-9_\-]+)\s*\}\}")
+
+
+class PlanError(ValueError):
+    """Raised when the model's plan cannot be parsed or is not a valid DAG."""
+
+
+class PlanExecuteAgent(ReactAgent):
+    """
+    Plan-and-execute mode. One LLM call plans the whole task as a dependency graph
+    of tool calls, the executor runs every ready step concurrently through the tool
+    registry, and a final LLM call writes the answer from the results. The model is
+    only asked to re-plan when a step fails.
+
+    Plan steps run concurrently on worker threads, so runs cannot suspend for user
+    input; suspend_on_user_input is rejected.
+    """
+
+    def __init__(self, *args, max_parallel_tools: int = 8, max_replans: int = 2, **kwargs):
+        if kwargs.get("suspend_on_user_input"):
+            raise ValueError("❌ Plan-and-execute runs cannot suspend for user input; use ReactAgent instead.")
+        super().__init__(*args, **kwargs)
+        self.max_parallel_tools = max_parallel_tools
+        self.max_replans = max_replans
+
+    # ---------- Prompts ----------
+
+    def _planning_system_prompt(self, query: str) -> str:
+        tools = self._select_tools(query, CompactTrace(blob_store=self.trace_blob_store))
+        tools_description = "\n\n".join(tool.get_tool_description() for tool in tools)
+        return f"""{self.user_system_prompt}
+
+You plan tool calls for a task up front. You have access to these tools:
+
+{tools_description}
+
+Respond with only a JSON object of this form:
+{{"steps": [{{"id": "s1", "action_type": "<action_type>", "input": <input_data>, "depends_on": []}}]}}
+
+### Rules:
+- Give every step a unique id and list the ids of the steps whose output it needs in "depends_on".
+- Steps with no dependencies on each other run in parallel, so only add real dependencies.
+- To use an earlier step's output in an input, write {{{{step_id}}}} (e.g. "{{{{s1}}}}") in place of the value.
+- Use an empty "steps" list if no tool is needed.
+- The current date is {self.current_date}.
+"""
+
+    def _synthesis_system_prompt(self) -> str:
+        return f"""{self.user_system_prompt}
+
+Write the final answer to the question using the tool results provided.
+Provide a complete, well-structured response that directly addresses the original question.
+If the results are empty or unrelated, say so instead of guessing; never hallucinate.
+- The current date is {self.current_date}.
+"""
+
+    @staticmethod
+    def _format_results(steps: List[Dict[str, Any]], results: Dict[str, Any]) -> str:
+        lines = []
+        for step in steps:
+            if step["id"] in results:
+                action_json = json.dumps({"action_type": step["action_type"], "input": step["input"]}, default=str)
+                lines.append(f"[{step['id']}] Action: {action_json}\nResult: {results[step['id']]}")
+        return "\n\n".join(lines)
+
+    # ---------- Plan parsing ----------
+
+    def _parse_plan(self, text: str, completed: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Parses and validates a plan. Steps may depend on ids in `completed` (results
+        kept from an earlier plan) but may not reuse them.
+        """
+        completed = completed or {}
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            raise PlanError("No JSON object found in the plan.")
+        try:
+            data = json.loads(text[start:end + 1])
+        except json.JSONDecodeError as e:
+            raise PlanError(f"Plan is not valid JSON: {e}")
+
+        steps = data.get("steps") if isinstance(data, dict) else None
+        if not isinstance(steps, list):
+            raise PlanError("Plan must have a 'steps' list.")
+
+        ids = set()
+        for step in steps:
+            if not isinstance(step, dict) or "id" not in step or "action_type" not in step:
+                raise PlanError(f"Every step needs an 'id' and an 'action_type': {step}")
+            step["id"] = str(step["id"])
+            if step["id"] in ids or step["id"] in completed:
+                raise PlanError(f"Duplicate step id '{step['id']}'.")
+            ids.add(step["id"])
+            if step["action_type"] not in self.tool_registry:
+                raise PlanError(f"Unknown action type '{step['action_type']}' in step '{step['id']}'.")
+            step.setdefault("input", None)
+            step["depends_on"] = [str(dep) for dep in step.get("depends_on") or []]
+
+        for step in steps:
+            # References in the input count as dependencies even if the model forgot to list them
+            references = set(_REFERENCE_RE.findall(json.dumps(step["input"], default=str)))
+            step["depends_on"] = list(dict.fromkeys(step["depends_on"] + sorted(references)))
+            for dep in step["depends_on"]:
+                if dep not in ids and dep not in completed:
+                    raise PlanError(f"Step '{step['id']}' depends on unknown step '{dep}'.")
+
+        # Reject cycles (Kahn's algorithm)
+        remaining = {step["id"]: set(step["depends_on"]) - set(completed) for step in steps}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise PlanError(f"Plan has a dependency cycle among: {', '.join(sorted(remaining))}")
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return steps
+
+    @staticmethod
+    def _substitute(value: Any, results: Dict[str, Any]) -> Any:
+        """
+        Replaces {{step_id}} references with step outputs. A string that is only a
+        reference takes the output as-is; otherwise the output is inserted as text.
+        """
+        if isinstance(value, str):
+            whole = _REFERENCE_RE.fullmatch(value.strip())
+            if whole:
+                return results[whole.group(1)]
+            return _REFERENCE_RE.sub(lambda m: str(results[m.group(1)]), value)
+        if isinstance(value, list):
+            return [PlanExecuteAgent._substitute(item, results) for item in value]
+        if isinstance(value, dict):
+            return {key: PlanExecuteAgent._substitute(item, results) for key, item in value.items()}
+        return value
+
+    # ---------- Execution ----------
+
+    @staticmethod
+    def _failed(result: Any) -> bool:
+        return str(result).startswith(("Error", "❌"))
+
+    def _execute_plan(self, steps: List[Dict[str, Any]], results: Dict[str, Any], trace: CompactTrace,
+                      deduper: ActionDeduper, budget: RunBudget, iteration: int):
+        """
+        Runs ready steps concurrently until the plan is done, yielding ActionDispatched and
+        ObservationReceived events. Steps already in `results` (from an earlier plan) are
+        skipped. Returns (failed step, error) on the first failure, else None.
+        """
+        pending = {step["id"]: step for step in steps if step["id"] not in results}
+        running = {}
+        failure = None
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel_tools) as pool:
+            while (pending or running) and failure is None:
+                for step_id, step in list(pending.items()):
+                    if all(dep in results for dep in step["depends_on"]):
+                        action = Action(action_type=step["action_type"], input=self._substitute(step["input"], results))
+                        print(f"🚀 Dispatching {step_id}: {action.model_dump_json()}")
+                        running[pool.submit(self._run_step, action, deduper, trace, budget)] = (step, action)
+                        del pending[step_id]
+                        yield ActionDispatched(iteration=iteration, action=action)
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step, action = running.pop(future)
+                    result = future.result()
+                    print(f"✅ Result of {step['id']}:", result)
+                    trace.append(thought=f"Plan step {step['id']}", action=action, observation=result,
+                                 has_observation=True)
+                    yield ObservationReceived(iteration=iteration, action=action, result=result)
+                    if not self._failed(result):
+                        results[step["id"]] = result
+                    elif failure is None:
+                        # Later failures in the same batch are in the trace; one is enough to re-plan
+                        failure = (step, str(result))
+
+            # Let steps already running finish and keep their results for the next plan
+            for future, (step, action) in running.items():
+                result = future.result()
+                trace.append(thought=f"Plan step {step['id']}", action=action, observation=result,
+                             has_observation=True)
+                yield ObservationReceived(iteration=iteration, action=action, result=result)
+                if not self._failed(result):
+                    results[step["id"]] = result
+        return failure
+
+    def _run_step(self, action: Action, deduper: ActionDeduper, trace: CompactTrace, budget: RunBudget) -> Any:
+        # Identical calls across re-plans are answered from earlier results
+        hit, cached = deduper.lookup(action.action_type, action.input)
+        if hit:
+            return trace.resolve(cached)
+        result = self.execute_tool(action, deadline=budget.remaining_seconds())
+        if not self._failed(result):
+            deduper.store(action.action_type, action.input, trace.spill(result))
+        return result
+
+    def _call_llm(self, system_prompt: str, prompt: str, budget: RunBudget) -> Optional[str]:
+        if self._budget_stop_reason(budget, system_prompt, prompt):
+            return None
+        return "".join(self._stream_llm_step(prompt, system_prompt, budget))
+
+    def _run_steps(self, query: str, trace: CompactTrace, deduper: ActionDeduper, budget: RunBudget,
+                   memory_context: str, iterations_count: int):
+        # Replaces the ReAct loop behind run(), stream() and astream(); each planning
+        # attempt and the final answer is one iteration of the event stream
+        if not self.client:
+            return self._finish(trace, "❌ No LLM is Connected. Please set and pass the OPENAI_API_KEY to AgentPro.")
+
+        planning_system_prompt = self._planning_system_prompt(query)
+        results: Dict[str, Any] = {}
+        steps: List[Dict[str, Any]] = []
+        feedback = ""
+        iteration = iterations_count
+
+        for attempt in range(self.max_replans + 1):
+            iteration += 1
+            yield StepStarted(iteration=iteration)
+            prompt = f"Question: {query}\n\n{memory_context}"
+            if results:
+                prompt += f"\nCompleted steps (reuse their ids and outputs, do not repeat them):\n{self._format_results(steps, results)}\n"
+            if feedback:
+                prompt += f"\nThe previous plan failed: {feedback}\nReturn a corrected plan.\n"
+
+            plan_text = self._call_llm(planning_system_prompt, prompt, budget)
+            if plan_text is None:
+                return self._partial_response(trace, "budget reached while planning")
+            print(f"🗺️ [Debug] Plan (attempt {attempt + 1}):\n{plan_text}")
+
+            try:
+                new_steps = self._parse_plan(plan_text, completed=results)
+            except PlanError as e:
+                feedback = str(e)
+                trace.append(thought=f"Plan rejected: {e}")
+                yield ThoughtEvent(iteration=iteration, thought=f"Plan rejected: {e}")
+                continue
+
+            # Completed steps stay available to the new plan under their old ids
+            steps = [step for step in steps if step["id"] in results] + new_steps
+            plan_thought = f"Plan: {json.dumps(new_steps, default=str)}"
+            trace.append(thought=plan_thought)
+            yield ThoughtEvent(iteration=iteration, thought=plan_thought)
+
+            failure = yield from self._execute_plan(new_steps, results, trace, deduper, budget, iteration)
+            if failure is None:
+                break
+            failed_step, error = failure
+            feedback = f"step '{failed_step['id']}' ({failed_step['action_type']}) returned: {error}"
+        else:
+            if not results:
+                return self._partial_response(trace, f"no working plan after {self.max_replans + 1} attempts")
+
+        iteration += 1
+        yield StepStarted(iteration=iteration)
+        synthesis_prompt = f"Question: {query}\n\n{memory_context}\nTool results:\n{self._format_results(steps, results) or '(none)'}\n"
+        answer = self._call_llm(self._synthesis_system_prompt(), synthesis_prompt, budget)
+        if answer is None:
+            return self._partial_response(trace, "budget reached before writing the answer")
+
+        final_answer = re.sub(r"^\s*(Thought:.*?)?Final Answer:\s*", "", answer, flags=re.DOTALL).strip()
+        # The answer prefix is only known once the whole answer is in, so it is sent in one piece
+        yield AnswerDelta(iteration=iteration, delta=final_answer)
+        response = self._finish(trace, final_answer)
+        if self.memory is not None:
+            try:
+                self.memory.remember(query, response)
+            except Exception as e:
+                print(f"⚠️ Could not save memories: {e}")
+        return response
@@ -1,42 +1,137 @@
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional, Union
 import requests
 import json
 import openai
 from .tools import Tool
-from .agent import Action, Observation, ThoughtStep, AgentResponse
-from .model import ModelClient, create_model
+from .agent import Action, AgentResponse, RunContinuation
+from .agent import (AgentEvent, StepStarted, ThoughtEvent, ActionDispatched, ObservationReceived, AnswerDelta,
+                    AnswerRetracted, RunFinished)
+from .model import ModelClient, create_model, estimate_tokens
+from .loop_guard import ActionDeduper, RunBudget
+from .tool_index import ToolIndex
+from .memory import MemoryStore
+from .trace import BlobStore, CompactTrace
+from .continuation import SuspendedRunStore
+from .tool_executor import ToolExecutor, shared_tool_executor
 
 import re
+import uuid
+import asyncio
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
 from datetime import datetime
 
 
+_FINAL_ANSWER_LINE_RE = re.compile(r"^Final Answer:", re.MULTILINE)
+
+
+def _partial_final_answer(step_text: str) -> Optional[str]:
+    """
+    The final answer as far as it has streamed: the text after a "Final Answer:" line
+    with no Action before it, cut at a following Action line. A trailing line that may
+    still turn into "Action:" is held back. None until such a line appears.
+    """
+    match = _FINAL_ANSWER_LINE_RE.search(step_text)
+    if not match or "Action:" in step_text[:match.start()]:
+        return None
+    answer = step_text[match.end():]
+    cut = answer.find("\nAction:")
+    if cut >= 0:
+        return answer[:cut]
+    last_line = answer.rfind("\n")
+    if last_line >= 0 and "Action:".startswith(answer[last_line + 1:]):
+        answer = answer[:last_line]
+    return answer
+
+
+# System prompts kept per agent, one per distinct combination of selected tools
+_PROMPT_CACHE_SIZE = 64
+
 
 class ReactAgent:
-    def __init__(self, model: Optional[ModelClient] = None, tools: List[Tool] = None, custom_system_prompt: str = None, max_iterations: int = 20):
+    def __init__(self, model: Optional[ModelClient] = None, tools: List[Tool] = None, custom_system_prompt: str = None, max_iterations: int = 20,
+                 tool_top_k: Optional[int] = None, tool_index: Optional[ToolIndex] = None,
+                 max_action_repeats: int = 2, max_seconds: Optional[float] = None, token_budget: Optional[int] = None,
+                 memory: Optional[MemoryStore] = None, memory_top_k: int = 5,
+                 trace_blob_store: Optional[BlobStore] = None, trace_spill_threshold: int = 2048,
+                 suspend_on_user_input: bool = False, suspended_store: Optional[SuspendedRunStore] = None,
+                 user_input_action: str = "request_user_input",
+                 tool_executor: Optional[ToolExecutor] = None, tool_timeout: Optional[float] = 60.0,
+                 async_executor: Optional[Executor] = None):
 
         self.client = model or create_model(provider="openai")
 
         self.max_iterations = max_iterations
 
+        # Run limits: repeated actions get a corrective hint after max_action_repeats,
+        # and runs stop with a partial answer at max_seconds or token_budget
+        self.max_action_repeats = max_action_repeats
+        self.max_seconds = max_seconds
+        self.token_budget = token_budget
+
+        # Long-term memory: relevant facts from earlier runs are recalled into the prompt
+        self.memory = memory
+        self.memory_top_k = memory_top_k
+
+        # Run traces are kept compact; observations above the threshold spill to the blob store
+        self.trace_blob_store = trace_blob_store
+        self.trace_spill_threshold = trace_spill_threshold
+
+        # Human-in-the-loop: instead of blocking on the user input tool, suspend the run
+        # and return a continuation that resume() picks up with the user's answer
+        self.suspend_on_user_input = suspend_on_user_input
+        self.suspended_store = suspended_store
+        self.user_input_action = user_input_action
+
+        # Tool calls run with a per-tool deadline and circuit breaker; the user input
+        # tool waits on a human, so it gets no deadline by default. Agents with the same
+        # timeouts share one executor per process
+        self.tool_executor = tool_executor or shared_tool_executor(default_timeout=tool_timeout,
+                                                                   timeouts={user_input_action: None})
+
+        # Worker threads that drive astream(); None uses the event loop's default executor
+        self.async_executor = async_executor
+
         # Get Tool Details
         self.tools = tools or []
         self.tool_registry = {tool.action_type: tool for tool in self.tools}
-        # Build dynamic system prompt
-        tools_description = "\n\n".join(tool.get_tool_description() for tool in self.tools)
-        tool_names = ", ".join(tool.action_type for tool in self.tools)
+
+        # Tool retrieval: only the top-k relevant tools are described in each step's prompt
+        self.tool_top_k = tool_top_k
+        self.tool_index = tool_index
+        if self.tool_index is None and self.tool_top_k:
+            self.tool_index = ToolIndex(self.tools)
+        self._prompt_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._tool_usage: Counter = Counter()
 
         # Get current date here
-        current_date = datetime.now().strftime("%B %d, %Y")
+        self.current_date = datetime.now().strftime("%B %d, %Y")
 
         # Default opening sentence
         default_opening = "You are an AI assistant that follows the ReAct (Reasoning + Acting) pattern."
         # Use custom system prompt if provided, otherwise use the default
         if custom_system_prompt:
-            user_system_prompt = custom_system_prompt
+            self.user_system_prompt = custom_system_prompt
         else:
-            user_system_prompt = default_opening
+            self.user_system_prompt = default_opening
+
+        # Full system prompt describing every registered tool
+        self.system_prompt = self._build_system_prompt(self.tools)
 
-        self.system_prompt = f"""{user_system_prompt}
+    def _build_system_prompt(self, tools: List[Tool]) -> str:
+        # Build dynamic system prompt
+        tools_description = "\n\n".join(tool.get_tool_description() for tool in tools)
+        tool_names = ", ".join(tool.action_type for tool in tools)
+
+        hidden_count = len(self.tools) - len(tools)
+        if hidden_count > 0:
+            tools_description += (
+                f"\n\n({hidden_count} more tools are registered but not listed here. "
+                "If none of the listed tools fit, describe the capability you need in your Thought.)"
+            )
+
+        return f"""{self.user_system_prompt}
         
 Your goal is to help users by breaking down complex tasks into a series of thought-out steps and actions.
 
@@ -65,84 +160,384 @@ Final Answer: Provide a complete, well-structured response that directly address
 - Use available tools wisely.
 - If stuck, reflect and retry but never hallucinate.
 - If observation is empty or not related, reflect and retry but never hallucinate.
-- The current date is {current_date}.
+- The current date is {self.current_date}.
 - If you follow the format strictly, you will be recognized as an excellent and trustworthy AI assistant.
 """
 
-    def _format_history(self, thought_process: List[ThoughtStep]) -> str:
-        history = ""
-        for step in thought_process:
-            if step.pause_reflection:
-                history += f"PAUSE: {step.pause_reflection}\n"
-            if step.thought:
-                history += f"Thought: {step.thought}\n"
-            if step.action:
-                history += f"Action: {step.action.model_dump_json()}\n"
-            if step.observation:
-                history += f"Observation: {step.observation.result}\n"
-        return history
-
-    def execute_tool(self, action: Action) -> str:
+    def _select_tools(self, query: str, trace: CompactTrace) -> List[Tool]:
+        """
+        Picks the tools to describe in this step's prompt: the top-k matches for the
+        query and latest thought, plus every tool already used in this run. When fewer
+        than k tools match, the rest are filled with the agent's most-used tools
+        (registration order until anything has been used).
+        """
+        if not self.tool_top_k or len(self.tools) <= self.tool_top_k:
+            return self.tools
+
+        search_text = query
+        if trace.records and trace.records[-1].thought:
+            search_text += " " + trace.records[-1].thought
+        selected = {tool.action_type for tool in self.tool_index.search(search_text, self.tool_top_k)}
+        if len(selected) < self.tool_top_k:
+            # sorted() is stable, so unused tools keep their registration order
+            for tool in sorted(self.tools, key=lambda t: -self._tool_usage[t.action_type]):
+                if len(selected) >= self.tool_top_k:
+                    break
+                selected.add(tool.action_type)
+
+        # Tools the model already called stay visible, even if it reached them via the fallback
+        selected.update(
+            record.action_type for record in trace
+            if record.action_type in self.tool_registry
+        )
+        return [tool for tool in self.tools if tool.action_type in selected]
+
+    def _get_system_prompt(self, query: str, trace: CompactTrace) -> str:
+        tools = self._select_tools(query, trace)
+        if tools is self.tools:
+            return self.system_prompt
+
+        key = tuple(tool.action_type for tool in tools)
+        prompt = self._prompt_cache.get(key)
+        if prompt is None:
+            prompt = self._build_system_prompt(tools)
+            self._prompt_cache[key] = prompt
+            if len(self._prompt_cache) > _PROMPT_CACHE_SIZE:
+                self._prompt_cache.popitem(last=False)
+        else:
+            self._prompt_cache.move_to_end(key)
+        return prompt
+
+    def execute_tool(self, action: Action, deadline: Optional[float] = None) -> str:
+        # Look up the full registry, so tools left out of the prompt still run when called
         tool = self.tool_registry.get(action.action_type)
         if not tool:
+            if self.tool_index:
+                suggestions = ", ".join(self.tool_index.suggest(action.action_type))
+                if suggestions:
+                    return f"Error: Unknown action type '{action.action_type}'. Did you mean one of: {suggestions}?"
             return f"Error: Unknown action type '{action.action_type}'"
-        
-        try:
-            return tool.run(action.input)
-        except Exception as e:
-            return f"Error running tool '{action.action_type}': {e}"
 
-    def _get_llm_response(self, prompt: str) -> str:
+        self._tool_usage[action.action_type] += 1
+        return self.tool_executor.run(tool, action.input, action.action_type, deadline=deadline)
+
+    def _get_llm_response(self, prompt: str, system_prompt: Optional[str] = None) -> str:
         if not self.client:
             raise ValueError("❌ LLM client not initialized")
         
         return self.client.chat_completion(
-            system_prompt=self.system_prompt,
+            system_prompt=system_prompt or self.system_prompt,
+            user_prompt=prompt,
+            )
+
+    def _stream_llm_response(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        return self.client.stream_chat_completion(
+            system_prompt=system_prompt or self.system_prompt,
             user_prompt=prompt,
             )
 
-    def run(self, query: str) -> AgentResponse:
-        thought_process: List[ThoughtStep] = []
+    def _execute_deduped(self, action: Action, deduper: ActionDeduper, trace: CompactTrace,
+                         budget: Optional[RunBudget] = None) -> str:
+        """
+        Executes an action, serving identical repeats from the observations of this run.
+        Errors are not reused, so a retry after a transient failure runs the tool again.
+        """
+        hit, cached = deduper.lookup(action.action_type, action.input)
+        if hit:
+            print("♻️ Repeated action, reusing earlier observation.")
+            result = trace.resolve(cached)
+        else:
+            result = self.execute_tool(action, deadline=budget.remaining_seconds() if budget else None)
+            if not str(result).startswith(("Error", "❌")):
+                deduper.store(action.action_type, action.input, trace.spill(result))
+
+        hint = deduper.corrective_hint(action.action_type, action.input)
+        if hint:
+            result = f"{result}\n\nNote: {hint}"
+        return result
+
+    @staticmethod
+    def _budget_stop_reason(budget: RunBudget, system_prompt: str, prompt: str) -> Optional[str]:
+        # Checked before each LLM call, so a call that would pass the deadline or token budget is never made
+        return budget.exceeded(next_tokens=estimate_tokens(system_prompt) + estimate_tokens(prompt))
+
+    def _stream_llm_step(self, prompt: str, system_prompt: str, budget: RunBudget) -> Iterator[str]:
+        """
+        Streams one LLM call and charges its prompt and response to the run's token budget.
+        """
+        text = ""
+        for chunk in self._stream_llm_response(prompt, system_prompt):
+            text += chunk
+            yield chunk
+        budget.add_tokens(estimate_tokens(system_prompt) + estimate_tokens(prompt) + estimate_tokens(text))
+
+    def _finish(self, trace: CompactTrace, final_answer: Optional[str]) -> AgentResponse:
+        """
+        Converts the compact trace into the public AgentResponse and releases its blobs.
+        """
+        response = AgentResponse(thought_process=trace.to_thought_steps(), final_answer=final_answer)
+        trace.close()
+        return response
+
+    def _partial_response(self, trace: CompactTrace, reason: str) -> AgentResponse:
+        """
+        Builds the best answer available from the steps so far when a run is cut short.
+        """
+        last_thought = next((record.thought for record in reversed(trace.records) if record.thought), None)
+        last_result = None
+        for record in reversed(trace.records):
+            if record.action_type is None:
+                continue
+            result = trace.observation_of(record)
+            if not str(result).startswith(("Error", "❌")):
+                last_result = result
+                break
+
+        final_answer = f"⚠️ Stopped early: {reason}."
+        if last_thought or last_result is not None:
+            final_answer += " Best partial answer from the steps completed so far:"
+            if last_thought:
+                final_answer += f"\n{last_thought}"
+            if last_result is not None:
+                final_answer += f"\n{last_result}"
+
+        return self._finish(trace, final_answer)
+
+    def _suspend(self, query: str, trace: CompactTrace, action: Action, iterations_count: int,
+                 budget: RunBudget, memory_context: str) -> AgentResponse:
+        """
+        Saves the run state and returns a suspended response asking the user for input.
+        """
+        continuation = RunContinuation(
+            run_id=uuid.uuid4().hex,
+            query=query,
+            steps=trace.to_state(),
+            pending_input=action.input,
+            iterations_count=iterations_count,
+            elapsed_seconds=budget.elapsed,
+            tokens_used=budget.tokens_used,
+            memory_context=memory_context
+        )
+        if self.suspended_store is not None:
+            self.suspended_store.save(continuation)
+        print(f"⏸️ Run {continuation.run_id} suspended, waiting for user input.")
+
+        response = self._finish(trace, None)
+        response.status = "suspended"
+        response.continuation = continuation
+        return response
+
+    @staticmethod
+    def _consume(events: Iterator[AgentEvent]) -> AgentResponse:
+        for event in events:
+            if isinstance(event, RunFinished):
+                return event.response
+        raise RuntimeError("Agent run ended without a response")
+
+    def run(self, query: str, max_seconds: Optional[float] = None, token_budget: Optional[int] = None) -> AgentResponse:
+        return self._consume(self.stream(query, max_seconds=max_seconds, token_budget=token_budget))
+
+    def stream(self, query: str, max_seconds: Optional[float] = None,
+               token_budget: Optional[int] = None) -> Iterator[AgentEvent]:
+        """
+        Runs the agent, yielding events as they happen: StepStarted, ThoughtEvent,
+        ActionDispatched, ObservationReceived, AnswerDelta for each piece of the final
+        answer (followed by AnswerRetracted if the step turns out not to be final), and
+        a closing RunFinished carrying the AgentResponse. Closing the
+        generator cancels the run before its next LLM or tool call.
+        """
+        trace = CompactTrace(blob_store=self.trace_blob_store, spill_threshold=self.trace_spill_threshold)
+        deduper = ActionDeduper(max_repeats=self.max_action_repeats)
+        budget = RunBudget(
+            max_seconds=max_seconds if max_seconds is not None else self.max_seconds,
+            max_tokens=token_budget if token_budget is not None else self.token_budget
+        )
+
+        # Recall long-term memories once at run start
+        memory_context = ""
+        if self.memory is not None:
+            memory_context = self.memory.format_for_prompt(self.memory.search(query, k=self.memory_top_k))
+
+        yield from self._run_loop(query, trace, deduper, budget, memory_context, iterations_count=0)
+
+    async def astream(self, query: str, max_seconds: Optional[float] = None,
+                      token_budget: Optional[int] = None) -> AsyncIterator[AgentEvent]:
+        """
+        Async version of stream(). Blocking LLM and tool calls run on worker threads;
+        cancelling the consumer stops the run once the in-flight call returns.
+        """
+        async for event in self._aiterate(self.stream(query, max_seconds=max_seconds, token_budget=token_budget)):
+            yield event
+
+    async def _aiterate(self, events: Iterator[AgentEvent]) -> AsyncIterator[AgentEvent]:
+        # Advances a blocking event generator on async_executor, one event per worker call
+        loop = asyncio.get_running_loop()
+        lock = threading.Lock()
+        finished = object()
+
+        def advance():
+            with lock:
+                return next(events, finished)
+
+        def close():
+            with lock:
+                events.close()
+
+        pending = None
+        try:
+            while True:
+                pending = loop.run_in_executor(self.async_executor, advance)
+                event = await pending
+                pending = None
+                if event is finished:
+                    break
+                yield event
+        finally:
+            if pending is not None:
+                # A step may still be running on a worker thread; close the run once it returns
+                loop.run_in_executor(self.async_executor, close)
+            else:
+                events.close()
+
+    def resume(self, continuation: Union[RunContinuation, str], user_answer: str,
+               max_seconds: Optional[float] = None, token_budget: Optional[int] = None) -> AgentResponse:
+        """
+        Continues a suspended run, using the user's answer as the observation of the
+        pending user input action. Accepts a continuation or a run ID in suspended_store.
+        """
+        return self._consume(self.resume_stream(continuation, user_answer, max_seconds=max_seconds,
+                                                token_budget=token_budget))
+
+    async def aresume_stream(self, continuation: Union[RunContinuation, str], user_answer: str,
+                             max_seconds: Optional[float] = None,
+                             token_budget: Optional[int] = None) -> AsyncIterator[AgentEvent]:
+        """
+        Async version of resume_stream().
+        """
+        events = self.resume_stream(continuation, user_answer, max_seconds=max_seconds, token_budget=token_budget)
+        async for event in self._aiterate(events):
+            yield event
+
+    def resume_stream(self, continuation: Union[RunContinuation, str], user_answer: str,
+                      max_seconds: Optional[float] = None,
+                      token_budget: Optional[int] = None) -> Iterator[AgentEvent]:
+        """
+        Continues a suspended run like resume(), yielding the same events as stream().
+        """
+        if isinstance(continuation, str):
+            if self.suspended_store is None:
+                raise ValueError("❌ Resuming by run ID requires a suspended_store")
+            continuation = self.suspended_store.load(continuation)
+
+        trace = CompactTrace.from_state(continuation.steps, blob_store=self.trace_blob_store,
+                                        spill_threshold=self.trace_spill_threshold)
+        trace.set_observation(trace.records[-1], user_answer)
+
+        # Earlier observations are served again for repeated actions after resuming
+        deduper = ActionDeduper(max_repeats=self.max_action_repeats)
+        for record in trace.records[:-1]:
+            if record.action_type is not None and trace.has_observation(record):
+                if str(trace.observation_of(record)).startswith(("Error", "❌")):
+                    continue
+                hit, _ = deduper.lookup(record.action_type, record.action_input)
+                if not hit:
+                    deduper.store(record.action_type, record.action_input, record.observation)
+
+        budget = RunBudget(
+            max_seconds=max_seconds if max_seconds is not None else self.max_seconds,
+            max_tokens=token_budget if token_budget is not None else self.token_budget,
+            elapsed=continuation.elapsed_seconds,
+            tokens_used=continuation.tokens_used
+        )
+
+        finished = False
+        try:
+            for event in self._run_loop(continuation.query, trace, deduper, budget, continuation.memory_context,
+                                        iterations_count=continuation.iterations_count):
+                if isinstance(event, RunFinished) and self.suspended_store is not None:
+                    # Before the last event: callers may stop iterating once they have the response
+                    self.suspended_store.delete(continuation.run_id)
+                    finished = True
+                yield event
+        finally:
+            if not finished and self.suspended_store is not None:
+                # The run failed or was cancelled; hand it back so it can be resumed again
+                self.suspended_store.release(continuation.run_id)
+
+    def _run_loop(self, query: str, trace: CompactTrace, deduper: ActionDeduper, budget: RunBudget,
+                  memory_context: str, iterations_count: int) -> Iterator[AgentEvent]:
+        try:
+            response = yield from self._run_steps(query, trace, deduper, budget, memory_context, iterations_count)
+        except GeneratorExit:
+            # Cancelled by the caller: drop the run's spilled observations
+            trace.close()
+            raise
+        yield RunFinished(response=response)
+
+    def _run_steps(self, query: str, trace: CompactTrace, deduper: ActionDeduper, budget: RunBudget,
+                   memory_context: str, iterations_count: int):
         printed_prompt = False  # <<< ADD A FLAG
-        iterations_count = 0
-        
+        suspend_action = None
 
         while iterations_count < self.max_iterations:
             iterations_count += 1
             print("=" * 50 + f" Iteration {iterations_count} ")
+            yield StepStarted(iteration=iterations_count)
             
             # Initialize placeholders at the beginning
             thought = None
             action = None
-            observation = None
+            result = None
             pause_reflection = None
 
             # Get the System Prompt with History (Whole thought process)
-            prompt = f"{self.system_prompt}\n\nQuestion: {query}\n\n"
-            if thought_process:
-                prompt += self._format_history(thought_process)
+            system_prompt = self._get_system_prompt(query, trace)
+            # The system prompt goes to the client separately; repeating it here would double
+            # the prompt and break KV prefix reuse, since the user prompt changes every step
+            prompt = f"Question: {query}\n\n"
+            if memory_context:
+                prompt += f"{memory_context}\n"
+            if trace:
+                prompt += trace.format_history()
             prompt += "\nNow continue with next steps by strictly following the required format.\n"
 
+            # Stop with a partial answer before a call that would pass the deadline or token budget
+            stop_reason = self._budget_stop_reason(budget, system_prompt, prompt)
+            if stop_reason:
+                print(f"⏱️ {stop_reason}")
+                return self._partial_response(trace, stop_reason)
+
             # Print whole System Prompt once in the start
             if not printed_prompt:
                 print("✅  [Debug] Sending System Prompt (with history) to LLM:")
-                print(prompt)
+                print(f"{system_prompt}\n\n{prompt}")
                 print("=" * 50)
                 printed_prompt = True  # <<< Set flag True after printing
 
-            # Run LLM model
+            # Run LLM model, streaming the final answer to the caller as it is generated
             if self.client:
-                step_text = self._get_llm_response(prompt)
+                step_text = ""
+                answer_emitted = 0
+                for chunk in self._stream_llm_step(prompt, system_prompt, budget):
+                    step_text += chunk
+                    answer = _partial_final_answer(step_text)
+                    if answer is not None:
+                        answer = answer.lstrip()
+                        if len(answer) > answer_emitted:
+                            yield AnswerDelta(iteration=iterations_count, delta=answer[answer_emitted:])
+                            answer_emitted = len(answer)
             else:
-                return AgentResponse(
-                    thought_process=thought_process,
-                    final_answer="❌ No LLM is Connected. Please set and pass the OPENAI_API_KEY to AgentPro."
-                )
+                return self._finish(trace, "❌ No LLM is Connected. Please set and pass the OPENAI_API_KEY to AgentPro.")
 
             print("🤖 [Debug] Step LLM Response:")
             print(step_text)
             
-            if "Final Answer:" in step_text and "Action:" not in step_text:
+            is_final = "Final Answer:" in step_text and "Action:" not in step_text
+            if answer_emitted and not is_final:
+                # The step went on to an Action after the streamed answer
+                yield AnswerRetracted(iteration=iterations_count)
+
+            if is_final:
                 # Try to find last Thought before Final Answer
                 thought_match = re.search(r"Thought:\s*(.*?)(?:Action:|PAUSE:|Final Answer:|$)", step_text, re.DOTALL)
                 pause_match = re.search(r"PAUSE:\s*(.*?)(?:Thought:|Action:|Final Answer:|$)", step_text, re.DOTALL)
@@ -151,27 +546,34 @@ Final Answer: Provide a complete, well-structured response that directly address
                 if thought_match:
                     thought = thought_match.group(1).strip()
                     print("✅ Parsed Thought:", thought)
+                    yield ThoughtEvent(iteration=iterations_count, thought=thought)
 
                 # Extract PAUSE if found
                 if pause_match:
                     pause_reflection = pause_match.group(1).strip()
                     print("✅ Parsed Pause Reflection:", pause_reflection)
 
-                thought_process.append(ThoughtStep(
+                trace.append(
                         thought=thought,
                         pause_reflection=pause_reflection
-                    ))
-
-                # Extract Final Answer
-                final_answer_match = re.search(r"Final Answer:\s*(.*)", step_text, re.DOTALL)
-                if final_answer_match:
-                    final_answer = final_answer_match.group(1).strip()
-                    print("✅ Parsed Final Answer:", final_answer)
-
-                return AgentResponse(
-                    thought_process=thought_process,
-                    final_answer=final_answer
-                )
+                    )
+
+                # Extract Final Answer, preferring a marker at the start of a line
+                final_answer_match = _FINAL_ANSWER_LINE_RE.search(step_text) or re.search(r"Final Answer:", step_text)
+                final_answer = step_text[final_answer_match.end():].strip()
+                print("✅ Parsed Final Answer:", final_answer)
+                if len(final_answer) > answer_emitted:
+                    # The rest of the answer, e.g. a last line held back in case it was an Action
+                    yield AnswerDelta(iteration=iterations_count, delta=final_answer[answer_emitted:])
+
+                response = self._finish(trace, final_answer)
+                if self.memory is not None:
+                    try:
+                        self.memory.remember(query, response)
+                    except Exception as e:
+                        # The run itself succeeded; losing its memories shouldn't fail it
+                        print(f"⚠️ Could not save memories: {e}")
+                return response
             else:
                 try:
                     # Try Extracting Thought Action and Pause
@@ -183,6 +585,12 @@ Final Answer: Provide a complete, well-structured response that directly address
                     if thought_match:
                         thought = thought_match.group(1).strip()
                         print("✅ Parsed Thought:", thought)
+                        yield ThoughtEvent(iteration=iterations_count, thought=thought)
+
+                    # Extract PAUSE if found
+                    if pause_match:
+                        pause_reflection = pause_match.group(1).strip()
+                        print("✅ Parsed Pause Reflection:", pause_reflection)
 
                     # Extract Action if found
                     if action_match:
@@ -196,23 +604,26 @@ Final Answer: Provide a complete, well-structured response that directly address
                             input=action_data["input"]
                         )
 
+                        # Suspend instead of blocking on the user input tool
+                        if self.suspend_on_user_input and action.action_type == self.user_input_action:
+                            trace.append(thought=thought, action=action, pause_reflection=pause_reflection)
+                            suspend_action = action
+                            break
+
                         # Execute action
-                        result = self.execute_tool(action)
+                        yield ActionDispatched(iteration=iterations_count, action=action)
+                        result = self._execute_deduped(action, deduper, trace, budget)
                         print("✅ Parsed Action Results:", result)
-                        observation = Observation(result=result)
-
-                    # Extract PAUSE if found
-                    if pause_match:
-                        pause_reflection = pause_match.group(1).strip()
-                        print("✅ Parsed Pause Reflection:", pause_reflection)
+                        yield ObservationReceived(iteration=iterations_count, action=action, result=result)
 
                     # Record the thought step
-                    thought_process.append(ThoughtStep(
+                    trace.append(
                         thought=thought,
                         action=action,
-                        observation=observation,
-                        pause_reflection=pause_reflection
-                    ))
+                        observation=result,
+                        pause_reflection=pause_reflection,
+                        has_observation=action is not None
+                    )
                 except Exception as e:
                     print(f"❌ Error parsing LLM response: {e}")
                     print(f"❌ Raw step text: {step_text}")
@@ -231,20 +642,13 @@ Final Answer: Provide a complete, well-structured response that directly address
                     
                     print("✅ Parsed Action Results:", error_message)
 
-                    # Add error as an observation
-                    observation = Observation(result=error_message)
-    
-                    # Record the thought step with the error observation
-                    thought_process.append(ThoughtStep(
-                        thought=None,
-                        action=None,
-                        observation=observation,
-                        pause_reflection=None
-                        ))
+                    # Record the thought step with the error as an observation
+                    trace.append(observation=error_message)
                     # Continue to the next iteration instead of returning
         
+        if suspend_action is not None:
+            # Outside the parse handler, so a storage error isn't reported as a format error
+            return self._suspend(query, trace, suspend_action, iterations_count, budget, memory_context)
+
         # # If exceeded max steps
-        return AgentResponse(
-            thought_process=thought_process,
-            final_answer="❌ Stopped after reaching maximum iterations limit."
-        )
+        return self._finish(trace, "❌ Stopped after reaching maximum iterations limit.")
@@ -0,0 +1,462 @@
+# readpdf.py
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from pydantic import PrivateAttr
+from .base_tool import InputError, Tool
+from .tool_index import BM25Index
+import glob
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+
+# Try importing pypdf for text extraction
+try:
+    import pypdf
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# Idle readers kept by this process (pool workers keep theirs between tasks): path -> (mtime, mmap, reader).
+# A reader is taken out while in use, so it is never shared between threads or closed under one
+_READERS: "OrderedDict[str, Tuple[float, mmap.mmap, Any]]" = OrderedDict()
+_READERS_LOCK = threading.Lock()
+_MAX_OPEN_READERS = 4
+
+
+@contextmanager
+def _open_reader(path: str, mtime: float) -> Iterator[Any]:
+    """
+    Opens a PDF through a read-only memory map, so pages are paged in from the OS
+    cache on demand instead of the whole file being read into each process. The
+    reader goes back to the cache afterwards; concurrent callers get their own.
+    """
+    if not PYPDF_AVAILABLE:
+        raise ImportError("PDF ingestion requires pypdf. Install it with `pip install pypdf`.")
+
+    with _READERS_LOCK:
+        cached = _READERS.pop(path, None)
+    if cached is not None and cached[0] != mtime:
+        cached[1].close()
+        cached = None
+    if cached is None:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        cached = (mtime, mapped, pypdf.PdfReader(mapped))
+
+    try:
+        yield cached[2]
+    finally:
+        evicted = []
+        with _READERS_LOCK:
+            if path in _READERS:
+                evicted.append(cached)  # Another caller already returned one
+            else:
+                _READERS[path] = cached
+                while len(_READERS) > _MAX_OPEN_READERS:
+                    evicted.append(_READERS.popitem(last=False)[1])
+        # Only idle readers are evicted, so nobody is reading from these maps
+        for _, mapped, _ in evicted:
+            mapped.close()
+
+
+def _extract_pages(path: str, mtime: float, page_numbers: Sequence[int]) -> List[Tuple[int, str]]:
+    # Runs in a pool worker or inline; page numbers are 1-based
+    pages = []
+    with _open_reader(path, mtime) as reader:
+        for number in page_numbers:
+            try:
+                text = reader.pages[number - 1].extract_text() or ""
+            except Exception as e:
+                print(f"⚠️ Could not extract page {number} of {path}: {e}")
+                text = ""
+            pages.append((number, text))
+    return pages
+
+
+def count_pdf_pages(path: str) -> int:
+    path = os.path.abspath(os.path.expanduser(path))
+    with _open_reader(path, os.path.getmtime(path)) as reader:
+        return len(reader.pages)
+
+
+def iter_pdf_pages(path: str, pages: Optional[Iterable[int]] = None, max_workers: Optional[int] = None,
+                   pages_per_task: int = 4, executor: Optional[Executor] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) in page order while later pages are still being
+    extracted. Extraction is spread over a process pool (pass `executor` to reuse
+    one across files, or max_workers=1 to extract inline). Only a few tasks per
+    worker are queued ahead, so memory stays flat however long the document is.
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    mtime = os.path.getmtime(path)
+    with _open_reader(path, mtime) as reader:
+        page_count = len(reader.pages)
+    numbers = [n for n in (pages if pages is not None else range(1, page_count + 1)) if 1 <= n <= page_count]
+    batches = [numbers[i:i + pages_per_task] for i in range(0, len(numbers), pages_per_task)]
+
+    workers = max_workers or os.cpu_count() or 1
+    if executor is None and (workers == 1 or len(batches) <= 1):
+        for batch in batches:
+            yield from _extract_pages(path, mtime, batch)
+        return
+
+    own_executor = executor is None
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    in_flight = deque()
+    try:
+        for batch in batches:
+            in_flight.append(pool.submit(_extract_pages, path, mtime, batch))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+    finally:
+        # Also reached when the consumer stops early: drop the work it no longer needs
+        for future in in_flight:
+            future.cancel()
+        if own_executor:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_chunks(pages: Iterable[Tuple[int, str]], chunk_chars: int = 2000,
+                overlap_chars: int = 200) -> Iterator[Dict[str, Any]]:
+    """
+    Turns a stream of (page_number, text) into overlapping text chunks as pages
+    arrive. Each chunk records the pages it spans. Cuts fall on whitespace where possible.
+    """
+    buffer = ""
+    starts: List[Tuple[int, int]] = []  # (offset in buffer, page number)
+    fresh = False  # buffer holds text not yet emitted
+    index = 0
+
+    def page_at(offset: int) -> int:
+        page = starts[0][1]
+        for start, number in starts:
+            if start > offset:
+                break
+            page = number
+        return page
+
+    def chunk(end: int) -> Dict[str, Any]:
+        return {"index": index, "text": buffer[:end].strip(), "page_start": page_at(0), "page_end": page_at(end - 1)}
+
+    for number, text in pages:
+        text = text.strip()
+        if not text:
+            continue
+        if buffer:
+            buffer += "\n\n"
+        starts.append((len(buffer), number))
+        buffer += text
+        fresh = True
+
+        while len(buffer) >= chunk_chars:
+            cut = buffer.rfind(" ", chunk_chars // 2, chunk_chars)
+            cut = cut if cut > 0 else chunk_chars
+            yield chunk(cut)
+            index += 1
+
+            keep_from = max(cut - overlap_chars, 0)
+            space = buffer.find(" ", keep_from, cut)
+            keep_from = space + 1 if space >= 0 else keep_from
+            # Keep the start of the page the overlap begins in
+            first_page = page_at(keep_from)
+            starts = [(max(start - keep_from, 0), page) for start, page in starts if start >= keep_from or page == first_page]
+            buffer = buffer[keep_from:]
+            fresh = len(buffer) > cut - keep_from
+
+    if buffer.strip() and fresh:
+        yield chunk(len(buffer))
+
+
+def file_sha256(path: str) -> str:
+    """
+    Hashes a file through a memory map without reading it into memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, len(mapped), 1 << 20):
+                digest.update(mapped[offset:offset + (1 << 20)])
+    return digest.hexdigest()
+
+
+class PDFIngestor:
+    """
+    Ingests PDFs into a directory of chunk files (one JSONL file per distinct file
+    content) plus a manifest. Files whose content hash is unchanged since the last
+    ingest are skipped.
+    """
+
+    def __init__(self, path: str = os.path.join("~", ".agentpro", "pdf_index"), chunk_chars: int = 2000,
+                 overlap_chars: int = 200, max_workers: Optional[int] = None, pages_per_task: int = 4):
+        self.path = os.path.expanduser(path)
+        self.chunk_chars = chunk_chars
+        self.overlap_chars = overlap_chars
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
+        os.makedirs(os.path.join(self.path, "chunks"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._search_index: Optional[BM25Index] = None
+        self._search_chunks: List[Dict[str, Any]] = []
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def _chunk_file(self, sha256: str) -> str:
+        return os.path.join(self.path, "chunks", f"{sha256}.jsonl")
+
+    def _save_manifest(self):
+        manifest_path = os.path.join(self.path, "manifest.json")
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def is_current(self, path: str) -> bool:
+        """
+        True if the file's content matches its manifest entry. Size and mtime are
+        checked first so unchanged files are not re-hashed.
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        entry = self.manifest.get(path)
+        if entry is None or not os.path.exists(self._chunk_file(entry["sha256"])):
+            return False
+        stat = os.stat(path)
+        if stat.st_size == entry["size"] and stat.st_mtime == entry["mtime"]:
+            return True
+        if stat.st_size == entry["size"] and file_sha256(path) == entry["sha256"]:
+            with self._lock:
+                entry["mtime"] = stat.st_mtime
+                self._save_manifest()
+            return True
+        return False
+
+    def ingest_iter(self, path: str, force: bool = False, executor: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Ingests one PDF, yielding each chunk as soon as it is extracted. Yields nothing
+        if the file is unchanged since the last ingest (unless `force`).
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        if not force and self.is_current(path):
+            print(f"⏭️ Skipping unchanged {path}")
+            return
+
+        stat = os.stat(path)
+        sha256 = file_sha256(path)
+        chunk_file = self._chunk_file(sha256)
+        tmp_path = f"{chunk_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        started = time.perf_counter()
+        pages_seen = set()
+
+        def tracked_pages():
+            for number, text in iter_pdf_pages(path, max_workers=self.max_workers,
+                                               pages_per_task=self.pages_per_task, executor=executor):
+                pages_seen.add(number)
+                yield number, text
+
+        chunks = 0
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for chunk in iter_chunks(tracked_pages(), self.chunk_chars, self.overlap_chars):
+                    f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                    chunks += 1
+                    yield chunk
+            # The chunk file only becomes visible once the whole document is done
+            os.replace(tmp_path, chunk_file)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            self.manifest[path] = {
+                "sha256": sha256,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "pages": count_pdf_pages(path),
+                "chunks": chunks,
+                "ingest_seconds": round(time.perf_counter() - started, 3),
+                "ingested_at": time.time(),
+            }
+            self._save_manifest()
+            self._search_index = None
+        print(f"📄 Ingested {path}: {len(pages_seen)} pages, {chunks} chunks")
+
+    def ingest(self, path: str, force: bool = False, executor: Optional[Executor] = None) -> Dict[str, Any]:
+        """
+        Ingests one PDF and returns its manifest entry, with "skipped" set if it was unchanged.
+        """
+        skipped = not force and self.is_current(path)
+        if not skipped:
+            for _ in self.ingest_iter(path, force=True, executor=executor):
+                pass
+        return {**self.manifest[os.path.abspath(os.path.expanduser(path))], "skipped": skipped}
+
+    def ingest_directory(self, directory: str, pattern: str = "**/*.pdf", force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Ingests every matching PDF, sharing one process pool across files.
+        """
+        paths = sorted(glob.glob(os.path.join(os.path.expanduser(directory), pattern), recursive=True))
+        results = {}
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            for path in paths:
+                try:
+                    results[path] = self.ingest(path, force=force, executor=pool)
+                except Exception as e:
+                    print(f"❌ Failed to ingest {path}: {e}")
+                    results[path] = {"error": str(e)}
+        return results
+
+    def iter_document_chunks(self, path: str) -> Iterator[Dict[str, Any]]:
+        entry = self.manifest.get(os.path.abspath(os.path.expanduser(path)))
+        if entry is None:
+            raise KeyError(f"{path} has not been ingested")
+        with open(self._chunk_file(entry["sha256"]), "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def search(self, query: str, k: int = 5, path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 search over the chunks of every ingested document (or only `path`).
+        Each result carries its "source" file.
+        """
+        with self._lock:
+            if self._search_index is None:
+                self._search_chunks = []
+                for source in list(self.manifest):
+                    try:
+                        self._search_chunks.extend({**chunk, "source": source} for chunk in self.iter_document_chunks(source))
+                    except FileNotFoundError:
+                        continue
+                self._search_index = BM25Index([chunk["text"] for chunk in self._search_chunks])
+            index, chunks = self._search_index, self._search_chunks
+
+        if path is None:
+            return [chunks[i] for i in index.top(query, k)]
+        source = os.path.abspath(os.path.expanduser(path))
+        return [chunks[i] for i in index.top(query, len(chunks)) if chunks[i]["source"] == source][:k]
+
+
+class ReadPDFTool(Tool):
+    name: str = "PDF Reader"
+    action_type: str = "read_pdf"
+    input_format: str = (
+        'A JSON object. To read pages: {"path": "report.pdf", "pages": "1-3"} (pages optional). '
+        'To search ingested PDFs: {"query": "revenue growth", "path": "report.pdf"} (path optional). '
+        "A plain string is treated as a search query."
+    )
+    description: str = "Reads pages of a PDF file or searches the text of ingested PDF documents."
+
+    # Extraction runs inline by default (max_workers=1): the tool is called from a tool
+    # executor thread, and starting a process pool there forks a multi-threaded process.
+    # A passed-in ingestor keeps its own max_workers for ingestion.
+    # Paths come from the model, so only ingested documents and files under `allowed_dirs`
+    # can be opened; by default that is ingested documents only.
+    _config: Dict[str, Any] = PrivateAttr()
+    _ingestor: PDFIngestor = PrivateAttr()
+
+    def __init__(self, ingestor: Optional[PDFIngestor] = None, max_chars: int = 8000, top_k: int = 5,
+                 max_workers: int = 1, allowed_dirs: Optional[Sequence[str]] = None, **data):
+        super().__init__(**data)
+        self._ingestor = ingestor or PDFIngestor(max_workers=max_workers)
+        self._config = {
+            "max_chars": max_chars,
+            "top_k": top_k,
+            "max_workers": max_workers,
+            "allowed_dirs": [os.path.realpath(os.path.expanduser(d)) for d in allowed_dirs or []],
+        }
+
+    def _is_allowed(self, path: str) -> bool:
+        if os.path.abspath(path) in self._ingestor.manifest:
+            return True
+        real_path = os.path.realpath(path)
+        return any(os.path.commonpath([real_path, root]) == root for root in self._config["allowed_dirs"])
+
+    @staticmethod
+    def _parse_pages(spec: Any, page_count: int) -> Optional[List[int]]:
+        # Accepts "3", "1-3", "1,4,7-9" or a list of page numbers. Ranges are clamped to
+        # the document before they are expanded
+        if spec is None or spec == "":
+            return None
+        if isinstance(spec, int):
+            spec = [spec]
+        if isinstance(spec, list):
+            return [n for n in (int(p) for p in spec) if 1 <= n <= page_count]
+        numbers = []
+        for part in str(spec).split(","):
+            if "-" in part:
+                start, end = part.split("-", 1)
+                numbers.extend(range(max(int(start), 1), min(int(end), page_count) + 1))
+            elif part.strip() and 1 <= int(part) <= page_count:
+                numbers.append(int(part))
+        return numbers
+
+    def _truncate(self, text: str) -> str:
+        max_chars = self._config["max_chars"]
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars] + f"\n... [truncated, {len(text) - max_chars} more characters; request fewer pages]"
+
+    def run(self, input_text: Any) -> str:
+        if isinstance(input_text, str):
+            try:
+                input_data = json.loads(input_text)
+            except json.JSONDecodeError:
+                input_data = input_text.strip("'\"")
+            if isinstance(input_data, str):
+                input_data = {"path": input_data} if input_data.lower().endswith(".pdf") else {"query": input_data}
+        else:
+            input_data = input_text
+        if not isinstance(input_data, dict):
+            return InputError("❌ Error: Expected a JSON object with a 'path' or a 'query'.")
+
+        path = input_data.get("path")
+        query = input_data.get("query")
+        if path:
+            path = os.path.expanduser(path)
+            if not self._is_allowed(path):
+                return InputError(f"❌ Error: {path} is not an ingested document or in an allowed directory.")
+            if not os.path.exists(path):
+                return InputError(f"❌ Error: File not found: {path}")
+
+        try:
+            if query:
+                if path:
+                    self._ingestor.ingest(path)
+                results = self._ingestor.search(query, k=self._config["top_k"], path=path)
+                if not results:
+                    return f"No passages found for '{query}'."
+                return self._truncate("\n\n".join(
+                    f"[{os.path.basename(r['source'])}, pages {r['page_start']}-{r['page_end']}]\n{r['text']}" for r in results
+                ))
+
+            if not path:
+                return InputError("❌ Error: Provide a 'path' to read or a 'query' to search.")
+            try:
+                numbers = self._parse_pages(input_data.get("pages"), count_pdf_pages(path))
+            except (ValueError, TypeError):
+                return InputError(f"❌ Error: Invalid page range: {input_data.get('pages')}")
+            pages = iter_pdf_pages(path, pages=numbers, max_workers=self._config["max_workers"])
+            text, total = [], 0
+            # Stop extracting once the output limit is reached
+            for number, page_text in pages:
+                text.append(f"--- Page {number} ---\n{page_text}")
+                total += len(text[-1])
+                if total > self._config["max_chars"]:
+                    pages.close()
+                    break
+            return self._truncate("\n\n".join(text)) if text else "No text found on the requested pages."
+        except ImportError as e:
+            return f"❌ Error: {e}"
+        except Exception as e:
+            return f"❌ Error reading PDF: {e}"
@@ -1,4 +1,4 @@
-from .base_tool import Tool
+from .base_tool import InputError, Tool
 from pptx import Presentation
 from typing import Any, Optional
 from abc import ABC, abstractmethod
@@ -33,7 +33,7 @@ class SlideGenerationTool(Tool):
                 try:
                     input_data = json.loads(input_text)
                 except json.JSONDecodeError:
-                    return "Error: Input must be valid JSON. Strictly follow the Input Format of PowerPoint Slides Generator tool"
+                    return InputError("Error: Input must be valid JSON. Strictly follow the Input Format of PowerPoint Slides Generator tool")
             else:
                 input_data = input_text
             
@@ -0,0 +1,29 @@
+from typing import List, Optional
+import pytest
+from agentpro.model import ModelClient
+
+
+class ScriptedModel(ModelClient):
+    """
+    Returns the given responses in order and records the prompts it was sent.
+    """
+
+    def __init__(self, *responses: str):
+        super().__init__(model_name="scripted")
+        self.responses = list(responses)
+        self.prompts: List[str] = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.prompts)
+
+    def chat_completion(self, system_prompt: str, user_prompt: str,
+                        temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        self.prompts.append(user_prompt)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def scripted_model():
+    """Factory for ScriptedModel: `scripted_model("Thought: ...", "Final Answer: ...")`."""
+    return ScriptedModel
@@ -0,0 +1,113 @@
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import pytest
+from agentpro.react_agent import ReactAgent
+from agentpro.base_tool import Tool, ToolOutput
+from agentpro.continuation import SuspendedRunStore
+
+
+class ImageTool(Tool):
+    name: str = "Image"
+    description: str = "Returns a ToolOutput like the image generator."
+    action_type: str = "img"
+    input_format: str = "A prompt"
+
+    def run(self, input_text: Any) -> ToolOutput:
+        return ToolOutput(result=f"Generated image saved to /tmp/{input_text}.png", image_paths=[f"/tmp/{input_text}.png"])
+
+
+class AskTool(Tool):
+    name: str = "Ask"
+    description: str = "Asks the user."
+    action_type: str = "request_user_input"
+    input_format: str = "A question"
+
+    def run(self, input_text: Any) -> str:
+        raise AssertionError("should suspend instead")
+
+
+def _model(scripted_model):
+    return scripted_model(
+        'Thought: draw\nAction: {"action_type": "img", "input": "cat"}',
+        'Thought: ask\nAction: {"action_type": "request_user_input", "input": "Which colour?"}',
+        "Thought: done\nFinal Answer: A blue cat.",
+    )
+
+
+def test_suspends_after_tool_output_observation_and_resumes(tmp_path, scripted_model):
+    store = SuspendedRunStore(str(tmp_path))
+    model = _model(scripted_model)
+    agent = ReactAgent(model=model, tools=[ImageTool(), AskTool()], suspend_on_user_input=True, suspended_store=store)
+
+    response = agent.run("Draw a cat")
+    assert response.status == "suspended"
+    assert model.calls == 2
+    assert store.list_ids() == [response.continuation.run_id]
+    response.model_dump_json()
+
+    resumed = agent.resume(response.continuation.run_id, "Blue")
+    assert resumed.final_answer == "A blue cat."
+    assert resumed.thought_process[0].observation.result == "Generated image saved to /tmp/cat.png"
+    assert store.list_ids() == []
+
+
+def test_storage_errors_are_not_reported_as_format_errors(tmp_path, scripted_model):
+    class BrokenStore(SuspendedRunStore):
+        def save(self, continuation):
+            raise OSError("disk full")
+
+    model = _model(scripted_model)
+    agent = ReactAgent(model=model, tools=[ImageTool(), AskTool()], suspend_on_user_input=True,
+                       suspended_store=BrokenStore(str(tmp_path)))
+    with pytest.raises(OSError, match="disk full"):
+        agent.run("Draw a cat")
+    assert model.calls == 2
+
+
+def test_resume_streams_events_on_the_async_executor(tmp_path, scripted_model):
+    class CountingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            self.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    store = SuspendedRunStore(str(tmp_path))
+    executor = CountingExecutor(max_workers=1)
+    agent = ReactAgent(model=_model(scripted_model), tools=[ImageTool(), AskTool()], suspend_on_user_input=True,
+                       suspended_store=store, async_executor=executor)
+    run_id = agent.run("Draw a cat").continuation.run_id
+
+    async def collect():
+        return [event async for event in agent.aresume_stream(run_id, "Blue")]
+
+    events = asyncio.run(collect())
+    executor.shutdown()
+    assert [event.type for event in events] == ["step_started", "answer_delta", "thought", "finished"]
+    assert events[-1].response.final_answer == "A blue cat."
+    assert executor.submitted == len(events) + 1
+    assert store.list_ids() == []
+
+
+def test_a_run_is_claimed_by_one_resume_and_released_on_failure(tmp_path, scripted_model):
+    store = SuspendedRunStore(str(tmp_path))
+    model = scripted_model(
+        'Thought: ask\nPAUSE: need the colour first\nAction: {"action_type": "request_user_input", "input": "Which colour?"}',
+    )
+    agent = ReactAgent(model=model, tools=[AskTool()], suspend_on_user_input=True, suspended_store=store)
+    run_id = agent.run("Draw a cat").continuation.run_id
+
+    continuation = store.load(run_id)
+    assert continuation.steps[-1][5] == "need the colour first"
+    with pytest.raises(KeyError):
+        store.load(run_id)
+    with pytest.raises(KeyError):
+        agent.resume(run_id, "Blue")
+    store.release(run_id)
+    assert store.list_ids() == [run_id]
+
+    # A model with no responses left fails the resumed run
+    with pytest.raises(IndexError):
+        agent.resume(run_id, "Blue")
+    assert store.list_ids() == [run_id]
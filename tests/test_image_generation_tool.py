@@ -0,0 +1,114 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import base64
+import json
+import threading
+import pytest
+from agentpro.agent import AgentResponse, Observation, ThoughtStep
+from agentpro.image_generation_tool import ImageGenerationTool, stream_b64_json_to_file
+
+IMAGE = bytes(range(256)) * 40 + b"tail"
+
+
+def _b64_response(image: bytes) -> bytes:
+    # Escape "/" the way some JSON encoders do
+    encoded = base64.b64encode(image).decode().replace("/", "\\/")
+    return b'{"created": 1, "data": [{"b64_json" : "' + encoded.encode() + b'", "revised_prompt": "x"}]}'
+
+
+def _chunks(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 7, 64, 1000, 1 << 20])
+def test_stream_b64_json_to_file_across_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "image.png"
+    assert stream_b64_json_to_file(_chunks(_b64_response(IMAGE), chunk_size), str(path)) is None
+    assert path.read_bytes() == IMAGE
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 4, 5])
+def test_stream_b64_json_to_file_handles_padding(tmp_path, length):
+    path = tmp_path / "image.png"
+    stream_b64_json_to_file(_chunks(_b64_response(IMAGE[:length]), 3), str(path))
+    assert path.read_bytes() == IMAGE[:length]
+
+
+def test_stream_b64_json_to_file_returns_url_payload(tmp_path):
+    path = tmp_path / "image.png"
+    payload = {"created": 1, "data": [{"url": "http://example.com/a.png"}]}
+    assert stream_b64_json_to_file(_chunks(json.dumps(payload).encode(), 5), str(path)) == payload
+    assert not path.exists()
+
+
+def test_stream_b64_json_to_file_rejects_truncated_response(tmp_path):
+    with pytest.raises(ValueError):
+        stream_b64_json_to_file(_chunks(_b64_response(IMAGE)[:500], 64), str(tmp_path / "image.png"))
+
+
+@pytest.fixture
+def image_server():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests_seen.append(body)
+            data = _b64_response(body["prompt"].encode() * 100)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            for chunk in _chunks(data, 1000):
+                self.wfile.write(chunk)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1", requests_seen
+    server.shutdown()
+
+
+def test_batch_generation_against_stub_endpoint(tmp_path, image_server):
+    base_url, requests_seen = image_server
+    tool = ImageGenerationTool(api_key="stub", base_url=base_url, cache_dir=str(tmp_path))
+
+    output = tool.run({"prompts": ["a cat", "a dog", "a cat"], "size": "256x256"})
+
+    assert output.result.startswith("Generated 3 of 3 images")
+    assert sorted(body["prompt"] for body in requests_seen) == ["a cat", "a dog"]
+    assert all(body["response_format"] == "b64_json" for body in requests_seen)
+    with open(output.image_paths[0], "rb") as f:
+        assert f.read() == b"a cat" * 100
+
+    # Cache hit: no new request
+    output = tool.run('{"prompt": "a dog", "size": "256x256"}')
+    assert output.result.startswith("Generated image saved to")
+    assert len(requests_seen) == 2
+
+
+def test_tool_output_serialises_in_agent_response(tmp_path, image_server):
+    base_url, _ = image_server
+    output = ImageGenerationTool(api_key="stub", base_url=base_url, cache_dir=str(tmp_path)).run("a cow")
+    response = AgentResponse(thought_process=[ThoughtStep(observation=Observation(result=output))])
+
+    dumped = json.loads(response.model_dump_json())
+    assert dumped["thought_process"][0]["observation"]["result"]["image_paths"] == output.image_paths
+
+
+def test_execution_timeout_covers_the_batch(tmp_path):
+    tool = ImageGenerationTool(api_key="stub", cache_dir=str(tmp_path), max_workers=2, timeout=120)
+    assert tool.execution_timeout("a cat") == 240
+    assert tool.execution_timeout({"prompts": ["a", "b", "c", "a"]}) == 480
+    assert tool.execution_timeout(42) is None
+
+
+def test_api_failures_read_as_errors(tmp_path):
+    # Nothing listens on this port
+    tool = ImageGenerationTool(api_key="stub", base_url="http://127.0.0.1:9/v1", cache_dir=str(tmp_path), timeout=2)
+    single = tool.run("a cat")
+    assert str(single).startswith("Error: Image API request failed")
+
+    batch = tool.run({"prompts": ["a cat", "a dog"]})
+    assert str(batch).startswith("Error: Generated 0 of 2 images")
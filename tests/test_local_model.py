@@ -0,0 +1,106 @@
+import types
+import numpy as np
+import pytest
+from agentpro import local_model
+
+
+class FakeLlama:
+    """
+    Stands in for llama_cpp.Llama: bytes are tokens, and the KV cache is the list of
+    evaluated tokens. create_completion reuses the longest cached prefix, like llama.cpp.
+    """
+
+    def __init__(self, model_path, **kwargs):
+        self.input_ids = np.zeros(4096, dtype=np.intc)
+        self.n_tokens = 0
+        self.evaluated = []
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return ([1] if add_bos else []) + list(text)
+
+    def eval(self, tokens):
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+        self.evaluated.extend(tokens)
+
+    def reset(self):
+        self.n_tokens = 0
+
+    def save_state(self):
+        return self.input_ids[:self.n_tokens].copy()
+
+    def load_state(self, state):
+        self.input_ids[:len(state)] = state
+        self.n_tokens = len(state)
+
+    def create_completion(self, prompt, **kwargs):
+        cached = self.input_ids[:self.n_tokens].tolist()
+        common = 0
+        while common < min(len(cached), len(prompt)) and cached[common] == prompt[common]:
+            common += 1
+        self.n_tokens = common
+        self.eval(prompt[common:])
+        return {"choices": [{"text": "Final Answer: ok"}]}
+
+
+@pytest.fixture
+def fake_llama(monkeypatch):
+    monkeypatch.setattr(local_model, "llama_cpp", types.SimpleNamespace(Llama=FakeLlama), raising=False)
+    monkeypatch.setattr(local_model, "LLAMA_CPP_AVAILABLE", True)
+    monkeypatch.setattr(local_model, "_MODELS", {})
+
+
+def test_restore_prefix_reuses_cache_and_saved_states(fake_llama):
+    model = local_model.load_local_model("model.gguf", warmup=False)
+    llm = model.llm
+    first, second = [1, 10, 11, 12], [1, 20, 21]
+
+    model.restore_prefix(first)
+    assert model.stats["prefix_misses"] == 1
+
+    # Already in the KV cache: nothing is evaluated
+    llm.evaluated.clear()
+    model.restore_prefix(first)
+    assert model.stats["prefix_hits"] == 1 and llm.evaluated == []
+
+    # A different prefix evicts the cache; switching back loads the saved state
+    model.restore_prefix(second)
+    llm.evaluated.clear()
+    model.restore_prefix(first)
+    assert model.stats["prefix_hits"] == 2 and llm.evaluated == []
+    assert llm.input_ids[:llm.n_tokens].tolist() == first
+
+
+def test_restore_prefix_bounds_saved_states(fake_llama):
+    model = local_model.load_local_model("model.gguf", max_prefix_states=2, warmup=False)
+    for prefix in ([1, 2], [1, 3], [1, 4]):
+        model.restore_prefix(prefix)
+    assert list(model.prefix_states) == [(1, 3), (1, 4)]
+
+
+def test_count_reuse_counts_common_prefix(fake_llama):
+    model = local_model.load_local_model("model.gguf", warmup=False)
+    model.restore_prefix([1, 2, 3])
+    model.count_reuse([1, 2, 3, 4, 5])
+    model.count_reuse([1, 2, 9])
+    assert model.stats["prompt_tokens_reused"] == 5
+    assert model.stats["prompt_tokens_evaluated"] == 3
+
+
+def test_chat_completion_only_evaluates_new_suffix(fake_llama):
+    client = local_model.LocalLlamaClient("model.gguf", warmup=False)
+    client_again = local_model.LocalLlamaClient("model.gguf", warmup=False)
+    assert client_again.model is client.model
+
+    assert client.chat_completion("You are a test.", "Question: one") == "Final Answer: ok"
+    llm = client.model.llm
+    llm.evaluated.clear()
+    client_again.chat_completion("You are a test.", "Question: two")
+
+    # Only the tokens after "Question: " differ from what the KV cache already holds
+    suffix = client.suffix_template.format(user="Question: two").encode("utf-8")
+    assert llm.evaluated == list(suffix[len(b"Question: "):])
+    stats = local_model.local_model_stats()["model.gguf"]
+    assert stats["prefix_misses"] == 1 and stats["prefix_hits"] == 1
+    prefix = client.prefix_template.format(system="You are a test.").encode("utf-8")
+    assert stats["prompt_tokens_reused"] >= len(llm.tokenize(prefix, add_bos=True))
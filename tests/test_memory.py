@@ -0,0 +1,47 @@
+import os
+import threading
+from agentpro.memory import MemoryStore
+
+
+def test_concurrent_add_search_delete_and_save(tmp_path):
+    store = MemoryStore(path=str(tmp_path), max_items=200)
+    errors = []
+
+    def session(worker: int):
+        try:
+            for i in range(40):
+                store.add(f"fact {worker} {i} about topic {i % 7}")
+                store.search(f"topic {i % 7}")
+                if i % 10 == 0:
+                    store.delete(store.search(f"fact {worker}", k=1)[0]["id"])
+        except Exception as e:
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=session, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ["memory.npz"]
+    assert len(MemoryStore(path=str(tmp_path), max_items=200)) == len(store)
+
+
+def test_load_rejects_vectors_out_of_sync_with_ids(tmp_path):
+    import numpy as np
+    import pytest
+
+    store = MemoryStore(path=str(tmp_path))
+    for fact in ("one", "two", "three"):
+        store.add(f"fact {fact}")
+
+    store_path = os.path.join(str(tmp_path), "memory.npz")
+    with np.load(store_path) as data:
+        arrays = dict(data)
+    arrays["matrix"] = arrays["matrix"][:1]
+    with open(store_path, "wb") as f:
+        np.savez(f, **arrays)
+
+    with pytest.raises(ValueError, match="corrupt"):
+        MemoryStore(path=str(tmp_path))
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from agentpro.benchmarks import start_stub_completions_server
+from agentpro.client_registry import close_http_pool, client_registry_stats
+from agentpro.model import create_model
+
+
+def test_batching_handles_share_one_batcher():
+    server, base_url = start_stub_completions_server(base_latency=0.02, per_prompt_latency=0.0)
+    try:
+        threads_before = threading.active_count()
+        handles = [create_model("batching", base_url=base_url, api_key="stub", batch_window_ms=50) for _ in range(20)]
+
+        # One session per handle, as with one agent per session
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            answers = list(pool.map(lambda handle: handle.chat_completion("system", "ping"), handles))
+
+        assert answers == ["Thought: done.\nFinal Answer: ok"] * 20
+        assert client_registry_stats()["shared_clients"] == 1
+        # One collector plus at most max_inflight_batches senders
+        assert threading.active_count() - threads_before <= 3
+    finally:
+        close_http_pool()
+        server.shutdown()
+
+
+def test_batching_handle_survives_close_http_pool():
+    server, base_url = start_stub_completions_server(base_latency=0.0, per_prompt_latency=0.0)
+    try:
+        handle = create_model("batching", base_url=base_url, api_key="stub")
+        assert handle.chat_completion("system", "ping").endswith("ok")
+        close_http_pool()
+        assert handle.chat_completion("system", "ping").endswith("ok")
+    finally:
+        close_http_pool()
+        server.shutdown()
+
+
+def test_close_http_pool_resets_litellm_session():
+    import litellm
+    from agentpro.model import LiteLLMClient
+
+    previous = litellm.client_session
+    litellm.client_session = None
+    try:
+        client = LiteLLMClient(api_key="stub", model_name="gpt-4")
+        client._use_shared_session()
+        closed = litellm.client_session
+        assert closed is not None
+        close_http_pool()
+        assert litellm.client_session is None
+        client._use_shared_session()
+        assert litellm.client_session is not closed and not litellm.client_session.is_closed
+    finally:
+        close_http_pool()
+        litellm.client_session = previous
+
+
+def test_openai_handle_survives_close_http_pool():
+    handle = create_model("openai", api_key="stub", base_url="http://127.0.0.1:9/v1")
+    before = handle.client
+    close_http_pool()
+    assert handle.client is not before
+    assert not handle.client._client.is_closed
+    close_http_pool()
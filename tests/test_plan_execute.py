@@ -0,0 +1,75 @@
+import asyncio
+from typing import Any
+import pytest
+from agentpro.agent import ActionDispatched, AnswerDelta, ObservationReceived, RunFinished, StepStarted
+from agentpro.base_tool import Tool
+from agentpro.plan_execute import PlanExecuteAgent
+
+PLAN = '{"steps": [{"id": "s1", "action_type": "echo", "input": "a"}, {"id": "s2", "action_type": "echo", "input": "{{s1}}!"}]}'
+
+
+class EchoTool(Tool):
+    name: str = "Echo"
+    description: str = "Echoes its input."
+    action_type: str = "echo"
+    input_format: str = "Any string"
+
+    def run(self, input_text: Any) -> str:
+        return f"echo {input_text}"
+
+
+def test_stream_runs_the_plan(scripted_model):
+    agent = PlanExecuteAgent(model=scripted_model(PLAN, "Final Answer: done"), tools=[EchoTool()])
+    events = list(agent.stream("q"))
+
+    assert [event.iteration for event in events if isinstance(event, StepStarted)] == [1, 2]
+    assert [event.action.input for event in events if isinstance(event, ActionDispatched)] == ["a", "echo a!"]
+    assert [event.result for event in events if isinstance(event, ObservationReceived)] == ["echo a", "echo echo a!"]
+    assert "".join(event.delta for event in events if isinstance(event, AnswerDelta)) == "done"
+    assert isinstance(events[-1], RunFinished) and events[-1].response.final_answer == "done"
+
+
+def test_run_and_astream_use_plan_mode(scripted_model):
+    response = PlanExecuteAgent(model=scripted_model(PLAN, "done"), tools=[EchoTool()]).run("q")
+    assert response.final_answer == "done"
+    assert len([step for step in response.thought_process if step.action]) == 2
+
+    async def collect():
+        agent = PlanExecuteAgent(model=scripted_model(PLAN, "done"), tools=[EchoTool()])
+        return [event async for event in agent.astream("q")]
+
+    events = asyncio.run(collect())
+    assert sum(isinstance(event, ActionDispatched) for event in events) == 2
+    assert events[-1].response.final_answer == "done"
+
+
+def test_suspending_for_user_input_is_rejected(scripted_model):
+    with pytest.raises(ValueError):
+        PlanExecuteAgent(model=scripted_model(), tools=[EchoTool()], suspend_on_user_input=True)
+
+
+class FailingTool(Tool):
+    name: str = "Failing"
+    description: str = "Always fails."
+    action_type: str = "fail"
+    input_format: str = "Any string"
+
+    def run(self, input_text: Any) -> str:
+        return f"Error: failed {input_text}"
+
+
+def test_concurrent_failures_are_not_kept_as_results(scripted_model, monkeypatch):
+    import concurrent.futures
+    from agentpro import plan_execute
+
+    # Release both steps in one batch
+    monkeypatch.setattr(plan_execute, "wait", lambda futures, return_when: concurrent.futures.wait(futures))
+    plan = '{"steps": [{"id": "a", "action_type": "fail", "input": 1}, {"id": "b", "action_type": "fail", "input": 2}]}'
+    model = scripted_model(plan, '{"steps": []}', "Nothing worked.")
+    response = PlanExecuteAgent(model=model, tools=[FailingTool()]).run("q")
+
+    replan_prompt, synthesis_prompt = model.prompts[1], model.prompts[2]
+    assert "previous plan failed" in replan_prompt
+    assert "Completed steps" not in replan_prompt
+    assert "Error: failed" not in synthesis_prompt
+    assert response.final_answer == "Nothing worked."
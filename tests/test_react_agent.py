@@ -0,0 +1,154 @@
+from typing import Any
+import threading
+import time
+from agentpro.react_agent import ReactAgent
+from agentpro.agent import Action
+from agentpro.base_tool import Tool
+from agentpro.loop_guard import ActionDeduper
+from agentpro.trace import CompactTrace
+
+
+class FlakyTool(Tool):
+    name: str = "Flaky"
+    description: str = "Fails on the first call, then succeeds."
+    action_type: str = "flaky"
+    input_format: str = "Any string"
+    calls: int = 0
+
+    def run(self, input_text: Any) -> str:
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("transient")
+        return f"ok: {input_text}"
+
+
+def test_identical_retry_after_transient_failure_runs_the_tool_again(scripted_model):
+    tool = FlakyTool()
+    agent = ReactAgent(model=scripted_model(), tools=[tool])
+    deduper = ActionDeduper()
+    trace = CompactTrace()
+    action = Action(action_type="flaky", input="x")
+
+    first = agent._execute_deduped(action, deduper, trace)
+    second = agent._execute_deduped(action, deduper, trace)
+
+    assert first.startswith("Error running tool 'flaky'")
+    assert second == "ok: x"
+    assert tool.calls == 2
+
+
+def test_successful_results_are_still_reused(scripted_model):
+    tool = FlakyTool(calls=1)
+    agent = ReactAgent(model=scripted_model(), tools=[tool])
+    deduper = ActionDeduper()
+    trace = CompactTrace()
+    action = Action(action_type="flaky", input="x")
+
+    assert agent._execute_deduped(action, deduper, trace) == "ok: x"
+    assert agent._execute_deduped(action, deduper, trace) == "ok: x"
+    assert tool.calls == 2
+
+
+def test_run_retries_transient_failure(scripted_model):
+    tool = FlakyTool()
+    action = 'Thought: call it\nAction: {"action_type": "flaky", "input": "x"}'
+    model = scripted_model(action, action, "Thought: done\nFinal Answer: ok")
+    response = ReactAgent(model=model, tools=[tool]).run("q")
+
+    observations = [step.observation.result for step in response.thought_process if step.observation]
+    assert observations[0].startswith("Error running tool 'flaky'")
+    assert observations[1] == "ok: x"
+    assert response.final_answer == "ok"
+
+
+class SearchTool(FlakyTool):
+    action_type: str = "search"
+
+    def run(self, input_text: Any) -> str:
+        self.calls += 1
+        return f"found {input_text}"
+
+
+def test_final_answer_mentioned_in_a_thought_still_runs_the_action(scripted_model):
+    from agentpro.agent import AnswerDelta
+
+    tool = SearchTool()
+    model = scripted_model(
+        'Thought: I need more data before I can write the Final Answer: searching now.\n'
+        'Action: {"action_type": "search", "input": "x"}',
+        "Thought: done\nFinal Answer: 42",
+    )
+    events = list(ReactAgent(model=model, tools=[tool]).stream("q"))
+
+    assert tool.calls == 1
+    assert [event.iteration for event in events if isinstance(event, AnswerDelta)] == [2]
+    assert events[-1].response.final_answer == "42"
+
+
+def test_streamed_answer_is_retracted_when_an_action_follows(scripted_model):
+    from agentpro.agent import AnswerDelta, AnswerRetracted
+
+    tool = SearchTool()
+    model = scripted_model(
+        'Thought: guess\nFinal Answer: 41\nAction: {"action_type": "search", "input": "x"}',
+        "Thought: done\nFinal Answer: 42\nchecked twice",
+    )
+    # Stream one character at a time
+    model.stream_chat_completion = lambda *args, **kwargs: iter(model.chat_completion(*args, **kwargs))
+    events = list(ReactAgent(model=model, tools=[tool]).stream("q"))
+
+    assert tool.calls == 1
+    first = "".join(event.delta for event in events if isinstance(event, AnswerDelta) and event.iteration == 1)
+    second = "".join(event.delta for event in events if isinstance(event, AnswerDelta) and event.iteration == 2)
+    assert first.strip() == "41" and "Action" not in first
+    assert [event.iteration for event in events if isinstance(event, AnswerRetracted)] == [1]
+    assert second == events[-1].response.final_answer == "42\nchecked twice"
+
+
+def test_agents_share_the_process_wide_tool_executor(scripted_model):
+    from agentpro.tool_executor import ToolExecutor
+
+    first = ReactAgent(model=scripted_model(), tools=[FlakyTool()])
+    second = ReactAgent(model=scripted_model(), tools=[FlakyTool()])
+    assert first.tool_executor is second.tool_executor
+    assert first.tool_executor.timeout_for("request_user_input") is None
+
+    own = ToolExecutor()
+    assert ReactAgent(model=scripted_model(), tools=[], tool_executor=own).tool_executor is own
+    assert ReactAgent(model=scripted_model(), tools=[], tool_timeout=5.0).tool_executor is not first.tool_executor
+
+
+class ExitingTool(FlakyTool):
+    def run(self, input_text: Any) -> str:
+        raise SystemExit(1)
+
+
+def test_tool_thread_exiting_without_result_counts_as_failure():
+    from agentpro.tool_executor import ToolExecutor
+
+    executor = ToolExecutor()
+    result = executor.run(ExitingTool(), "x")
+    assert result.startswith("Error running tool 'flaky'")
+    assert executor.metrics()["flaky"]["failures"] == 1
+
+
+class BlockingTool(FlakyTool):
+    release: Any = None
+
+    def run(self, input_text: Any) -> str:
+        self.release.wait(5)
+        return "late"
+
+
+def test_tool_calls_stop_at_the_run_deadline(scripted_model):
+    tool = BlockingTool(release=threading.Event())
+    model = scripted_model('Thought: wait\nAction: {"action_type": "flaky", "input": "x"}')
+    agent = ReactAgent(model=model, tools=[tool], max_seconds=0.2, tool_timeout=5)
+
+    started = time.monotonic()
+    response = agent.run("q")
+    tool.release.set()
+    assert time.monotonic() - started < 2
+    assert "stopped at the run's deadline" in str(response.thought_process[0].observation.result)
+    assert response.final_answer.startswith("⚠️ Stopped early: wall-clock deadline")
+    assert model.calls == 1
@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from agentpro import readpdf
+from agentpro.benchmarks import make_synthetic_pdf
+from agentpro.readpdf import ReadPDFTool, PDFIngestor, iter_pdf_pages
+
+
+def test_concurrent_reads_share_the_reader_cache_safely(tmp_path):
+    # More files than cached readers, so readers are evicted while other threads read
+    paths = [make_synthetic_pdf(str(tmp_path / f"doc{i}.pdf"), pages=6, lines_per_page=5) for i in range(6)]
+
+    def read(job):
+        path = paths[job % len(paths)]
+        return path, list(iter_pdf_pages(path, max_workers=1, pages_per_task=1))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(read, range(48)))
+
+    for path, pages in results:
+        assert [number for number, _ in pages] == list(range(1, 7))
+        assert all(f"Page {number} line 0" in text for number, text in pages)
+    assert len(readpdf._READERS) <= readpdf._MAX_OPEN_READERS
+
+
+def test_tool_reads_pages_inline(tmp_path, monkeypatch):
+    path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=12, lines_per_page=2)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("ReadPDFTool should not start a process pool by default")
+
+    monkeypatch.setattr(readpdf, "ProcessPoolExecutor", no_pool)
+    tool = ReadPDFTool(ingestor=PDFIngestor(path=str(tmp_path / "index")), allowed_dirs=[str(tmp_path)])
+    text = tool.run({"path": path, "pages": "2-11"})
+    assert "--- Page 2 ---" in text and "--- Page 11 ---" in text
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tool = ReadPDFTool()
+    assert tool._ingestor.max_workers == 1
+
+
+def test_tool_only_opens_ingested_or_allowed_files(tmp_path):
+    docs, elsewhere = tmp_path / "docs", tmp_path / "elsewhere"
+    docs.mkdir()
+    elsewhere.mkdir()
+    allowed = make_synthetic_pdf(str(docs / "a.pdf"), pages=2, lines_per_page=2)
+    outside = make_synthetic_pdf(str(elsewhere / "b.pdf"), pages=2, lines_per_page=2)
+    ingestor = PDFIngestor(path=str(tmp_path / "index"))
+
+    tool = ReadPDFTool(ingestor=ingestor)
+    assert "not an ingested document" in tool.run({"path": allowed})
+    assert "not an ingested document" in tool.run({"path": outside, "query": "line"})
+    assert ingestor.manifest == {}
+
+    ingestor.ingest(outside)
+    assert "--- Page 1 ---" in tool.run({"path": outside})
+
+    tool = ReadPDFTool(ingestor=ingestor, allowed_dirs=[str(docs)])
+    assert "--- Page 2 ---" in tool.run({"path": allowed})
+    escape = os.path.join(str(docs), "..", "elsewhere", "c.pdf")
+    assert "not an ingested document" in tool.run({"path": escape})
+
+
+def test_page_ranges_are_clamped_to_the_document():
+    assert ReadPDFTool._parse_pages("1-999999999", 3) == [1, 2, 3]
+    assert ReadPDFTool._parse_pages("0,2,5-9", 6) == [2, 5, 6]
+    assert ReadPDFTool._parse_pages([1, 4], 3) == [1]
+    assert ReadPDFTool._parse_pages("", 3) is None
@@ -0,0 +1,73 @@
+from typing import Any, Optional
+import threading
+from agentpro.base_tool import InputError, Tool
+from agentpro.tool_executor import CircuitBreaker, ToolExecutor
+
+
+class UpstreamTool(Tool):
+    name: str = "Upstream"
+    description: str = "Reports upstream failures as error strings, like the search tool."
+    action_type: str = "upstream"
+    input_format: str = "'bad' for invalid input, anything else hits the failing upstream"
+
+    def run(self, input_text: Any) -> str:
+        if input_text == "bad":
+            return InputError("❌ Error: Expected a query string.")
+        return "Error performing search: 202 Ratelimit"
+
+
+def test_returned_upstream_errors_open_the_breaker():
+    executor = ToolExecutor(failure_threshold=3)
+    for _ in range(3):
+        assert executor.run(UpstreamTool(), "q").startswith("Error performing search")
+    assert executor.metrics()["upstream"]["state"] == CircuitBreaker.OPEN
+    assert "temporarily disabled" in executor.run(UpstreamTool(), "q")
+
+
+def test_input_errors_do_not_count_against_the_breaker():
+    executor = ToolExecutor(failure_threshold=3)
+    for _ in range(5):
+        assert executor.run(UpstreamTool(), "bad") == "❌ Error: Expected a query string."
+    metrics = executor.metrics()["upstream"]
+    assert metrics["state"] == CircuitBreaker.CLOSED
+    assert metrics["failures"] == 0 and metrics["successes"] == 5
+
+
+class SlowTool(Tool):
+    name: str = "Slow"
+    description: str = "Declares its own deadline."
+    action_type: str = "slow"
+    input_format: str = "Seconds to sleep"
+    release: Any = None
+
+    def run(self, input_text: Any) -> str:
+        self.release.wait(5)
+        return "done"
+
+    def execution_timeout(self, input_text: Any) -> Optional[float]:
+        return float(input_text)
+
+
+def test_tool_execution_timeout_replaces_the_default():
+    executor = ToolExecutor(default_timeout=0.05)
+    tool = SlowTool(release=threading.Event())
+    timer = threading.Timer(0.2, tool.release.set)
+    timer.start()
+    assert executor.run(tool, "2") == "done"
+
+    # An explicit per-action override still wins
+    executor = ToolExecutor(default_timeout=5, timeouts={"slow": 0.05})
+    assert "timed out" in executor.run(SlowTool(release=threading.Event()), "5")
+
+
+def test_run_deadline_caps_the_timeout_without_opening_the_breaker():
+    executor = ToolExecutor(default_timeout=5, failure_threshold=2)
+    tool = SlowTool(release=threading.Event())
+    for _ in range(3):
+        assert "stopped at the run's deadline" in executor.run(tool, "5", deadline=0.05)
+    assert "deadline was reached" in executor.run(tool, "5", deadline=0)
+    tool.release.set()
+
+    metrics = executor.metrics()["slow"]
+    assert metrics["state"] == CircuitBreaker.CLOSED
+    assert metrics["calls"] == 3 and metrics["timeouts"] == 0
@@ -0,0 +1,230 @@
+# tool_executor.py
+from typing import Any, Dict, Optional
+from .base_tool import InputError, Tool
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Per-tool circuit breaker. After `failure_threshold` consecutive failures the
+    circuit opens and calls fail fast. Once `reset_timeout` seconds have passed it
+    half-opens and lets a single probe call through: success closes the circuit,
+    failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class ToolExecutor:
+    """
+    Runs tool calls with a deadline and a circuit breaker per action type.
+
+    Each call runs on a daemon thread. Python cannot kill a thread, so a call that
+    overruns its deadline is abandoned: the agent gets a timeout error right away
+    and the thread's eventual result is discarded. Exceptions, timeouts and returned
+    "Error"/"❌" results (e.g. a caught upstream failure) count as failures; InputError
+    results, for input the tool rejected, do not.
+
+    `timeouts` overrides the default per action type; None means no deadline. Without
+    an override, a tool's execution_timeout() replaces the default. A call's
+    `deadline` (the seconds left in the agent's run) caps its timeout; running into
+    it is the run's limit, not the tool's, so it does not count against the breaker.
+    """
+
+    def __init__(self, default_timeout: Optional[float] = 60.0, timeouts: Optional[Dict[str, Optional[float]]] = None,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, action_type: str, tool: Optional[Tool] = None, input_data: Any = None) -> Optional[float]:
+        if action_type in self.timeouts:
+            return self.timeouts[action_type]
+        tool_timeout = tool.execution_timeout(input_data) if tool is not None else None
+        return tool_timeout if tool_timeout is not None else self.default_timeout
+
+    def breaker(self, action_type: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(action_type)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[action_type] = breaker
+                self._metrics[action_type] = {
+                    "calls": 0, "successes": 0, "failures": 0, "timeouts": 0,
+                    "short_circuits": 0, "abandoned_running": 0, "total_seconds": 0.0, "last_error": None,
+                }
+            return breaker
+
+    def _count(self, action_type: str, **updates):
+        with self._lock:
+            metrics = self._metrics[action_type]
+            for name, value in updates.items():
+                if name == "last_error":
+                    metrics[name] = value
+                else:
+                    metrics[name] += value
+
+    def run(self, tool: Tool, input_data: Any, action_type: Optional[str] = None,
+            deadline: Optional[float] = None) -> Any:
+        action_type = action_type or tool.action_type
+        if deadline is not None and deadline <= 0:
+            return f"Error: The run's deadline was reached before tool '{action_type}' could run."
+        breaker = self.breaker(action_type)
+        if not breaker.allow():
+            self._count(action_type, short_circuits=1)
+            return (f"Error: Tool '{action_type}' is temporarily disabled after repeated failures. "
+                    f"Retry in {breaker.retry_after():.1f}s or use another tool.")
+
+        self._count(action_type, calls=1)
+        outcome: Dict[str, Any] = {}
+        finished = threading.Event()
+
+        def target():
+            try:
+                outcome["result"] = tool.run(input_data)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                with self._lock:
+                    finished.set()
+                    if outcome.get("abandoned"):
+                        self._metrics[action_type]["abandoned_running"] -= 1
+
+        started = time.perf_counter()
+        thread = threading.Thread(target=target, name=f"tool-{action_type}", daemon=True)
+        thread.start()
+        timeout = self.timeout_for(action_type, tool, input_data)
+        run_deadline = deadline is not None and (timeout is None or deadline < timeout)
+        if run_deadline:
+            timeout = deadline
+        completed = finished.wait(timeout)
+        elapsed = time.perf_counter() - started
+
+        if not completed:
+            with self._lock:
+                # Decided under the lock the thread finishes under, so a late finish is counted exactly once
+                outcome["abandoned"] = not finished.is_set()
+                if outcome["abandoned"]:
+                    self._metrics[action_type]["abandoned_running"] += 1
+            if outcome["abandoned"] and run_deadline:
+                self._count(action_type, total_seconds=elapsed, last_error="stopped at the run's deadline")
+                # Frees a half-open probe slot without judging the tool
+                breaker.release_probe()
+                print(f"⏱️ Tool '{action_type}' stopped at the run's deadline; abandoning the call.")
+                return f"Error: Tool '{action_type}' stopped at the run's deadline after {timeout:g}s."
+            if outcome["abandoned"]:
+                self._count(action_type, timeouts=1, total_seconds=elapsed,
+                            last_error=f"timed out after {timeout}s")
+                breaker.record_failure()
+                print(f"⏱️ Tool '{action_type}' timed out after {timeout}s; abandoning the call.")
+                return f"Error: Tool '{action_type}' timed out after {timeout:g}s."
+
+        if "result" not in outcome:
+            # SystemExit and the like are not caught; they end the thread without a result
+            error = outcome.get("error", "tool exited without a result")
+            self._count(action_type, failures=1, total_seconds=elapsed, last_error=str(error))
+            breaker.record_failure()
+            return f"Error running tool '{action_type}': {error}"
+
+        result = outcome["result"]
+        if str(result).startswith(("Error", "❌")) and not isinstance(result, InputError):
+            # The tool caught a failure itself, e.g. a rate limit or an upstream outage
+            self._count(action_type, failures=1, total_seconds=elapsed, last_error=str(result))
+            breaker.record_failure()
+            return result
+
+        self._count(action_type, successes=1, total_seconds=elapsed)
+        breaker.record_success()
+        return result
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Breaker state and call/failure/timeout/short-circuit counts per action type.
+        """
+        with self._lock:
+            snapshot = {action_type: dict(metrics) for action_type, metrics in self._metrics.items()}
+            breakers = dict(self._breakers)
+        for action_type, metrics in snapshot.items():
+            metrics["state"] = breakers[action_type].state
+        return snapshot
+
+
+_SHARED_EXECUTORS: Dict[tuple, ToolExecutor] = {}
+_SHARED_EXECUTORS_LOCK = threading.Lock()
+
+
+def shared_tool_executor(default_timeout: Optional[float] = 60.0,
+                         timeouts: Optional[Dict[str, Optional[float]]] = None) -> ToolExecutor:
+    """
+    Returns the process-wide executor for these timeouts, creating it on first use.
+    Agents without their own executor share it, so each tool's circuit breaker and
+    metrics cover every session in the process.
+    """
+    key = (default_timeout, tuple(sorted((timeouts or {}).items())))
+    with _SHARED_EXECUTORS_LOCK:
+        executor = _SHARED_EXECUTORS.get(key)
+        if executor is None:
+            executor = ToolExecutor(default_timeout=default_timeout, timeouts=timeouts)
+            _SHARED_EXECUTORS[key] = executor
+        return executor
@@ -0,0 +1,128 @@
+from .base_tool import Tool
+from typing import Callable, Dict, List, Optional, Sequence
+from collections import Counter
+import math
+import re
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that appear in almost every tool description and carry no signal
+_STOPWORDS = {
+    "a", "an", "and", "as", "for", "from", "given", "in", "is", "it", "of", "on",
+    "or", "the", "to", "with", "string", "example", "returns", "input", "format",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases text and splits it into alphanumeric terms (snake_case is split too).
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower().replace("_", " ")) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 keyword index over a fixed list of texts.
+    """
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._doc_terms: List[Counter] = [Counter(tokenize(doc)) for doc in documents]
+        self._doc_lengths = [sum(terms.values()) for terms in self._doc_terms]
+        self._avg_length = (sum(self._doc_lengths) / len(self._doc_lengths)) if self._doc_lengths else 0.0
+        doc_freq: Counter = Counter()
+        for terms in self._doc_terms:
+            doc_freq.update(terms.keys())
+        n_docs = len(self._doc_terms)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def scores(self, query: str) -> List[float]:
+        query_terms = set(tokenize(query))
+        scores = []
+        for terms, length in zip(self._doc_terms, self._doc_lengths):
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1.0))
+                score += self._idf[term] * tf * (self.k1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def top(self, query: str, k: int) -> List[int]:
+        """
+        Returns the indices of up to k documents sharing at least one term with the query, best first.
+        """
+        scores = self.scores(query)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [i for i in ranked if scores[i] > 0][:k]
+
+
+class ToolIndex:
+    """
+    Ranks registered tools by relevance to a query so that only the top-k tool
+    descriptions have to be sent to the LLM.
+
+    By default tools are keyword-indexed with BM25 over their name, action type,
+    description and input format. Pass `embed_fn` (a callable mapping a list of
+    texts to a list of vectors) to rank by cosine similarity instead.
+    """
+
+    def __init__(self, tools: Sequence[Tool], embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 k1: float = 1.5, b: float = 0.75):
+        self.tools: List[Tool] = list(tools)
+        self.embed_fn = embed_fn
+        self.k1 = k1
+        self.b = b
+
+        documents = [self._document(tool) for tool in self.tools]
+
+        # Keyword index
+        self._bm25 = BM25Index(documents, k1=k1, b=b)
+
+        # Optional embedding index (vectors are normalised once up front)
+        self._vectors: Optional[List[List[float]]] = None
+        if self.embed_fn and documents:
+            self._vectors = [self._normalise(v) for v in self.embed_fn(documents)]
+
+    @staticmethod
+    def _document(tool: Tool) -> str:
+        return f"{tool.name} {tool.action_type} {tool.description} {tool.input_format}"
+
+    @staticmethod
+    def _normalise(vector: Sequence[float]) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def _embedding_scores(self, query: str) -> List[float]:
+        query_vector = self._normalise(self.embed_fn([query])[0])
+        return [sum(a * b for a, b in zip(query_vector, vector)) for vector in self._vectors]
+
+    def search(self, query: str, k: int) -> List[Tool]:
+        """
+        Returns up to k tools ordered by relevance. Tools with no overlap with the
+        query are not returned in keyword mode.
+        """
+        if not self.tools or k <= 0:
+            return []
+
+        if self._vectors is not None:
+            scores = self._embedding_scores(query)
+            ranked = sorted(range(len(self.tools)), key=lambda i: scores[i], reverse=True)
+        else:
+            ranked = self._bm25.top(query, k)
+
+        return [self.tools[i] for i in ranked[:k]]
+
+    def suggest(self, action_type: str, k: int = 3) -> List[str]:
+        """
+        Returns the action types closest to an unknown action type the model asked for.
+        """
+        return [tool.action_type for tool in self.search(action_type, k)]
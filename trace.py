@@ -0,0 +1,234 @@
+# trace.py
+from typing import Any, Dict, Iterator, List, Optional
+from .agent import Action, Observation, ThoughtStep
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+# Marker for "step has no observation" (None is a valid observation result)
+_MISSING = object()
+
+
+class BlobRef:
+    """
+    Reference to a large observation stored in a BlobStore.
+    """
+    __slots__ = ("digest", "size")
+
+    def __init__(self, digest: str, size: int):
+        self.digest = digest
+        self.size = size
+
+    def __repr__(self):
+        return f"BlobRef({self.digest[:12]}, {self.size} chars)"
+
+
+class BlobStore:
+    """
+    Content-addressed, reference-counted store for large observation strings.
+    Identical observations from different sessions share one file on disk.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or tempfile.mkdtemp(prefix="agentpro-blobs-")
+        os.makedirs(self.path, exist_ok=True)
+        self._refcounts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.path, digest[:2], digest)
+
+    def put(self, text: str) -> BlobRef:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            count = self._refcounts.get(digest, 0)
+            if count == 0 and not os.path.exists(self._file(digest)):
+                os.makedirs(os.path.dirname(self._file(digest)), exist_ok=True)
+                tmp_path = f"{self._file(digest)}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._file(digest))
+            self._refcounts[digest] = count + 1
+        return BlobRef(digest, len(text))
+
+    def get(self, ref: BlobRef) -> str:
+        with open(self._file(ref.digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def release(self, ref: BlobRef):
+        with self._lock:
+            count = self._refcounts.get(ref.digest, 0) - 1
+            if count > 0:
+                self._refcounts[ref.digest] = count
+                return
+            self._refcounts.pop(ref.digest, None)
+            try:
+                os.remove(self._file(ref.digest))
+            except FileNotFoundError:
+                pass
+
+
+_default_store: Optional[BlobStore] = None
+_default_store_lock = threading.Lock()
+
+
+def default_blob_store() -> BlobStore:
+    """
+    Returns the process-wide blob store in a temp directory removed at exit.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = BlobStore()
+            atexit.register(shutil.rmtree, _default_store.path, True)
+        return _default_store
+
+
+class TraceRecord:
+    """
+    One agent step. `observation` is the raw result, or a BlobRef when it was spilled.
+    """
+    __slots__ = ("thought", "action_type", "action_input", "observation", "pause_reflection")
+
+    def __init__(self, thought: Optional[str] = None, action_type: Optional[str] = None, action_input: Any = None,
+                 observation: Any = None, pause_reflection: Optional[str] = None):
+        self.thought = thought
+        self.action_type = action_type
+        self.action_input = action_input
+        self.observation = observation
+        self.pause_reflection = pause_reflection
+
+
+class CompactTrace:
+    """
+    Low-allocation trace of a run. Steps are slotted records with interned action
+    types, observations longer than `spill_threshold` characters live in a BlobStore,
+    and pydantic ThoughtSteps are only built by `to_thought_steps()`.
+    """
+    __slots__ = ("records", "blob_store", "spill_threshold", "_owned")
+
+    def __init__(self, blob_store: Optional[BlobStore] = None, spill_threshold: int = 2048):
+        self.records: List[TraceRecord] = []
+        self.blob_store = blob_store or default_blob_store()
+        self.spill_threshold = spill_threshold
+        self._owned: List[BlobRef] = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        return iter(self.records)
+
+    def spill(self, value: Any) -> Any:
+        """
+        Moves a large string to the blob store and returns its reference; other values pass through.
+        """
+        if isinstance(value, str) and len(value) > self.spill_threshold:
+            ref = self.blob_store.put(value)
+            self._owned.append(ref)
+            return ref
+        return value
+
+    def resolve(self, value: Any) -> Any:
+        if isinstance(value, BlobRef):
+            return self.blob_store.get(value)
+        return value
+
+    def append(self, thought: Optional[str] = None, action: Optional[Action] = None, observation: Any = None,
+               pause_reflection: Optional[str] = None, has_observation: bool = False) -> TraceRecord:
+        """
+        Records a step. Pass has_observation=True when the observation itself may be None.
+        """
+        record = TraceRecord(
+            thought=thought,
+            action_type=sys.intern(action.action_type) if action else None,
+            action_input=action.input if action else None,
+            observation=self.spill(observation) if (observation is not None or has_observation) else _MISSING,
+            pause_reflection=pause_reflection,
+        )
+        self.records.append(record)
+        return record
+
+    def observation_of(self, record: TraceRecord) -> Any:
+        return None if record.observation is _MISSING else self.resolve(record.observation)
+
+    @staticmethod
+    def has_observation(record: TraceRecord) -> bool:
+        return record.observation is not _MISSING
+
+    def set_observation(self, record: TraceRecord, observation: Any):
+        record.observation = self.spill(observation)
+
+    def to_state(self) -> List[list]:
+        """
+        Plain, JSON-serialisable snapshot of the records with spilled observations inlined.
+        Values JSON can't hold (e.g. a ToolOutput) are stored as their str().
+        """
+        return [
+            [record.thought, record.action_type, record.action_input, self.has_observation(record),
+             self._plain(self.observation_of(record)), record.pause_reflection]
+            for record in self.records
+        ]
+
+    @staticmethod
+    def _plain(value: Any) -> Any:
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return json.loads(json.dumps(value, default=str))
+
+    @classmethod
+    def from_state(cls, state: List[list], blob_store: Optional[BlobStore] = None,
+                   spill_threshold: int = 2048) -> "CompactTrace":
+        trace = cls(blob_store=blob_store, spill_threshold=spill_threshold)
+        for thought, action_type, action_input, has_observation, observation, pause_reflection in state:
+            trace.records.append(TraceRecord(
+                thought=thought,
+                action_type=sys.intern(action_type) if action_type is not None else None,
+                action_input=action_input,
+                observation=trace.spill(observation) if has_observation else _MISSING,
+                pause_reflection=pause_reflection,
+            ))
+        return trace
+
+    def format_history(self) -> str:
+        parts = []
+        for record in self.records:
+            if record.pause_reflection:
+                parts.append(f"PAUSE: {record.pause_reflection}\n")
+            if record.thought:
+                parts.append(f"Thought: {record.thought}\n")
+            if record.action_type is not None:
+                action_json = json.dumps({"action_type": record.action_type, "input": record.action_input},
+                                         ensure_ascii=False, separators=(",", ":"), default=str)
+                parts.append(f"Action: {action_json}\n")
+            if record.observation is not _MISSING:
+                parts.append(f"Observation: {self.observation_of(record)}\n")
+        return "".join(parts)
+
+    def to_thought_steps(self) -> List[ThoughtStep]:
+        """
+        Materialises the pydantic models for the API boundary.
+        """
+        return [
+            ThoughtStep(
+                thought=record.thought,
+                action=Action(action_type=record.action_type, input=record.action_input) if record.action_type is not None else None,
+                observation=Observation(result=self.observation_of(record)) if record.observation is not _MISSING else None,
+                pause_reflection=record.pause_reflection,
+            )
+            for record in self.records
+        ]
+
+    def close(self):
+        """
+        Releases this trace's blobs. Call once the trace has been converted or discarded.
+        """
+        for ref in self._owned:
+            self.blob_store.release(ref)
+        self._owned = []
@@ -1,4 +1,4 @@
-from .base_tool import Tool
+from .base_tool import InputError, Tool
 import json
 from typing import Any, Optional, Dict
 from pydantic import PrivateAttr
@@ -31,7 +31,7 @@ class TraversaalProRAGTool(Tool):
     def run(self, input_text: Any) -> str:
             
         if not isinstance(input_text, str):
-            return "❌ Error: Expected a query string. Example: 'chemical safety protocol'"
+            return InputError("❌ Error: Expected a query string. Example: 'chemical safety protocol'")
 
         # Validate API key
         api_key = self._config.get("api_key")
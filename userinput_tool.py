@@ -1,4 +1,4 @@
-from .base_tool import Tool
+from .base_tool import InputError, Tool
 from typing import Any, Optional, Dict
 from abc import ABC, abstractmethod
 from pydantic import BaseModel, PrivateAttr
@@ -15,7 +15,7 @@ class UserInputTool(Tool):
 
     def run(self, input_text: Any) -> str:  # <<< Change 'input' to 'input_text'
         if not isinstance(input_text, str):
-            return "Error: Expected a prompt string to request user input."
+            return InputError("Error: Expected a prompt string to request user input.")
         
         # Ask user for input properly
         user_response = input(f"\n🧠 AI assistant: {input_text}\n👤 User response: ")
@@ -1,4 +1,4 @@
-from .base_tool import Tool
+from .base_tool import InputError, Tool
 import yfinance as yf
 from typing import Any
 import json
@@ -11,16 +11,19 @@ class YFinanceTool(Tool):
         "A JSON with 'ticker' and optional 'detail_level' ('basic' or 'extended').\n"
         "Example: {\"ticker\": \"AAPL\", \"detail_level\": \"extended\"}"
     )
+    timeout: float = 10  # seconds, for price-history requests (stock.info has no timeout of its own)
 
     def run(self, input_text: Any) -> str:
         if isinstance(input_text, str):
             try:
                 input_text = json.loads(input_text)
             except json.JSONDecodeError:
-                return "❌ Error: Expected JSON input like {\"ticker\": \"AAPL\"}."
+                return InputError("❌ Error: Expected JSON input like {\"ticker\": \"AAPL\"}.")
 
         if not isinstance(input_text, dict) or "ticker" not in input_text:
-            return "❌ Error: Missing 'ticker' field in input."
+            return InputError("❌ Error: Missing 'ticker' field in input.")
+        if not isinstance(input_text["ticker"], str) or not isinstance(input_text.get("detail_level", "basic"), str):
+            return InputError("❌ Error: 'ticker' and 'detail_level' must be strings.")
 
         ticker_symbol = input_text["ticker"].strip().upper()
         detail_level = input_text.get("detail_level", "basic").lower()
@@ -50,7 +53,7 @@ class YFinanceTool(Tool):
                        f"\nDividend Yield: {dividend_yield}")
 
             # Add last 5 days closing prices
-            history = stock.history(period="5d")
+            history = stock.history(period="5d", timeout=self.timeout)
             if not history.empty:
                 output += "\nLast 5 Days Closing Prices:"
                 for date, row in history.iterrows():